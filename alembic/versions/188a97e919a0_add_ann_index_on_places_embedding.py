@@ -0,0 +1,57 @@
+"""add_ann_index_on_places_embedding
+
+Revision ID: 188a97e919a0
+Revises: 9823631f3409
+Create Date: 2026-10-18 10:12:41.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '188a97e919a0'
+down_revision: Union[str, Sequence[str], None] = '9823631f3409'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Эмбеддинги нормированы -> косинус (vector_cosine_ops), под него search_places использует <=>.
+    # CONCURRENTLY, чтобы не блокировать записи в places на время построения индекса
+    with op.get_context().autocommit_block():
+        if settings.VECTOR_INDEX == "ivfflat":
+            # ivfflat строить на уже заполненной таблице, иначе центроиды будут мусорными
+            op.create_index(
+                'ix_places_embedding_ivfflat',
+                'places',
+                ['embedding'],
+                unique=False,
+                postgresql_using='ivfflat',
+                postgresql_with={'lists': settings.IVFFLAT_LISTS},
+                postgresql_ops={'embedding': 'vector_cosine_ops'},
+                postgresql_concurrently=True,
+            )
+        else:
+            op.create_index(
+                'ix_places_embedding_hnsw',
+                'places',
+                ['embedding'],
+                unique=False,
+                postgresql_using='hnsw',
+                postgresql_with={'m': 16, 'ef_construction': 64},
+                postgresql_ops={'embedding': 'vector_cosine_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_embedding_ivfflat")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_embedding_hnsw")
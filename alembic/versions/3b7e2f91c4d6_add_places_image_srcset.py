@@ -0,0 +1,30 @@
+"""add_places_image_srcset
+
+Revision ID: 3b7e2f91c4d6
+Revises: 75189e24fcbe
+Create Date: 2026-10-18 15:10:12.504211
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e2f91c4d6'
+down_revision: Union[str, Sequence[str], None] = '75189e24fcbe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # заполняется при импорте (seed.py / ingest.py / POST /places/bulk)
+    op.add_column('places', sa.Column('image_srcset', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('places', 'image_srcset')
@@ -0,0 +1,28 @@
+"""add_user_token_version
+
+Revision ID: 40be08877045
+Revises: 410d812a76c0
+Create Date: 2026-10-18 12:20:05.913377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '40be08877045'
+down_revision: Union[str, Sequence[str], None] = '410d812a76c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,38 @@
+"""add_place_external_id_and_content_hash
+
+Revision ID: 410d812a76c0
+Revises: 188a97e919a0
+Create Date: 2026-10-18 11:03:17.442190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '410d812a76c0'
+down_revision: Union[str, Sequence[str], None] = '188a97e919a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('places', sa.Column('external_id', sa.String(), nullable=True))
+    op.add_column('places', sa.Column('content_hash', sa.String(), nullable=True))
+    # уже существующие места получают ключ city:name, как его строит импорт
+    # (при дублях - только первое, остальные остаются без ключа)
+    op.execute(
+        "UPDATE places SET external_id = city || ':' || name "
+        "WHERE id IN (SELECT min(id) FROM places GROUP BY city, name)"
+    )
+    op.create_unique_constraint(op.f('places_external_id_key'), 'places', ['external_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint(op.f('places_external_id_key'), 'places', type_='unique')
+    op.drop_column('places', 'content_hash')
+    op.drop_column('places', 'external_id')
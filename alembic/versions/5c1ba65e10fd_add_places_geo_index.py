@@ -0,0 +1,31 @@
+"""add_places_geo_index
+
+Revision ID: 5c1ba65e10fd
+Revises: f8ece539a0b9
+Create Date: 2026-10-18 13:40:12.665031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1ba65e10fd'
+down_revision: Union[str, Sequence[str], None] = 'f8ece539a0b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # без PostGIS: cube + earthdistance есть в стандартной поставке Postgres
+    op.execute("CREATE EXTENSION IF NOT EXISTS cube")
+    op.execute("CREATE EXTENSION IF NOT EXISTS earthdistance")
+    op.execute("CREATE INDEX ix_places_earth ON places USING gist (ll_to_earth(lat, lon))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_places_earth")
@@ -0,0 +1,65 @@
+"""add_places_compact_embeddings
+
+Revision ID: 6d2c8e4f1a93
+Revises: a51d6c0e8b27
+Create Date: 2026-10-18 16:20:05.441927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import HALFVEC, BIT
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2c8e4f1a93'
+down_revision: Union[str, Sequence[str], None] = 'a51d6c0e8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# halfvec и binary_quantize - pgvector >= 0.7
+HALF_EXPRESSION = "embedding::halfvec(768)"
+BITS_EXPRESSION = "binary_quantize(embedding)::bit(768)"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сжатые копии считает сам Postgres: ingest/create_place пишут только embedding.
+    # Добавление STORED-колонки переписывает таблицу под эксклюзивной блокировкой
+    op.add_column('places', sa.Column('embedding_half', HALFVEC(768), sa.Computed(HALF_EXPRESSION, persisted=True), nullable=True))
+    op.add_column('places', sa.Column('embedding_bits', BIT(768), sa.Computed(BITS_EXPRESSION, persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        # float16: индекс вдвое меньше float32 при почти той же точности
+        op.create_index(
+            'ix_places_embedding_half_hnsw',
+            'places',
+            ['embedding_half'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding_half': 'halfvec_cosine_ops'},
+            postgresql_concurrently=True,
+        )
+        # 1 бит на измерение (96 байт на вектор): только шорт-лист, порядок уточняет rerank
+        op.create_index(
+            'ix_places_embedding_bits_hnsw',
+            'places',
+            ['embedding_bits'],
+            unique=False,
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding_bits': 'bit_hamming_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_embedding_bits_hnsw")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_embedding_half_hnsw")
+    op.drop_column('places', 'embedding_bits')
+    op.drop_column('places', 'embedding_half')
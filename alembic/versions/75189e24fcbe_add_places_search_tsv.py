@@ -0,0 +1,43 @@
+"""add_places_search_tsv
+
+Revision ID: 75189e24fcbe
+Revises: 5c1ba65e10fd
+Create Date: 2026-10-18 14:25:50.310877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '75189e24fcbe'
+down_revision: Union[str, Sequence[str], None] = '5c1ba65e10fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# название: simple (бренды, латиница) + russian (стемминг), описание - B, контекст - C
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(search_context, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'places',
+        sa.Column('search_tsv', postgresql.TSVECTOR(), sa.Computed(SEARCH_TSV_EXPRESSION, persisted=True), nullable=True),
+    )
+    op.create_index('ix_places_search_tsv', 'places', ['search_tsv'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_places_search_tsv', table_name='places', postgresql_using='gin')
+    op.drop_column('places', 'search_tsv')
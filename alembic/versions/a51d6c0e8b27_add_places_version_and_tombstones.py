@@ -0,0 +1,70 @@
+"""add_places_version_and_tombstones
+
+Revision ID: a51d6c0e8b27
+Revises: 3b7e2f91c4d6
+Create Date: 2026-10-18 15:42:37.918406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a51d6c0e8b27'
+down_revision: Union[str, Sequence[str], None] = '3b7e2f91c4d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# колонки, изменение которых видно клиенту (PlaceResponse) + удаление;
+# embedding/content_hash сюда не входят
+SYNCED_COLUMNS = (
+    "name", "city", "type", "price", "description", "search_context",
+    "image_url", "image_srcset", "lat", "lon", "deleted_at",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE places_version_seq")
+    # существующие строки получают версии по порядку при добавлении колонки
+    op.add_column('places', sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('places_version_seq')"), nullable=False))
+    op.execute("ALTER SEQUENCE places_version_seq OWNED BY places.version")
+    op.add_column('places', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('places', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_places_city_version', 'places', ['city', 'version'], unique=False)
+
+    # версия растет при любом изменении, которое должен увидеть /places/export?since=
+    op.execute(
+        """
+        CREATE FUNCTION places_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('places_version_seq');
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    old_row = ", ".join(f"OLD.{column}" for column in SYNCED_COLUMNS)
+    new_row = ", ".join(f"NEW.{column}" for column in SYNCED_COLUMNS)
+    # повторный импорт без изменений версию не трогает
+    op.execute(
+        f"""
+        CREATE TRIGGER places_bump_version BEFORE UPDATE ON places
+        FOR EACH ROW WHEN (({old_row}) IS DISTINCT FROM ({new_row}))
+        EXECUTE FUNCTION places_bump_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER places_bump_version ON places")
+    op.execute("DROP FUNCTION places_bump_version()")
+    op.drop_index('ix_places_city_version', table_name='places')
+    op.drop_column('places', 'deleted_at')
+    op.drop_column('places', 'updated_at')
+    op.drop_column('places', 'version')
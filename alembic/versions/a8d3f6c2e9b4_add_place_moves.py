@@ -0,0 +1,72 @@
+"""add_place_moves
+
+Revision ID: a8d3f6c2e9b4
+Revises: f4c2a8e6b1d3
+Create Date: 2026-10-19 12:08:51.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3f6c2e9b4'
+down_revision: Union[str, Sequence[str], None] = 'f4c2a8e6b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # дельта /places/export выбирает строки по городу, и место, уехавшее в другой
+    # город, из старого пропадало молча - клиент держал его там навсегда.
+    # Триггер запоминает прежний город, экспорт отдает по нему {"op": "delete"}
+    op.create_table(
+        'place_moves',
+        sa.Column('place_id', sa.Integer(), nullable=False),
+        sa.Column('city', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('change_xid', sa.BigInteger(), server_default=sa.text(CURRENT_XID), nullable=False),
+        # TRUNCATE places ... CASCADE (seed.py) чистит и переезды
+        sa.ForeignKeyConstraint(['place_id'], ['places.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('place_id', 'version'),
+    )
+    op.create_index('ix_place_moves_city_change_xid', 'place_moves', ['city', 'change_xid'], unique=False)
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION places_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('places_version_seq');
+            NEW.updated_at := now();
+            NEW.change_xid := {CURRENT_XID};
+            IF NEW.city IS DISTINCT FROM OLD.city THEN
+                INSERT INTO place_moves (place_id, city, version) VALUES (OLD.id, OLD.city, NEW.version);
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION places_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('places_version_seq');
+            NEW.updated_at := now();
+            NEW.change_xid := {CURRENT_XID};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.drop_index('ix_place_moves_city_change_xid', table_name='place_moves')
+    op.drop_table('place_moves')
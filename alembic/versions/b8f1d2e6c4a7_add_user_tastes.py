@@ -0,0 +1,45 @@
+"""add_user_tastes
+
+Revision ID: b8f1d2e6c4a7
+Revises: e3a9c4b7d215
+Create Date: 2026-10-18 17:48:26.105733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f1d2e6c4a7'
+down_revision: Union[str, Sequence[str], None] = 'e3a9c4b7d215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_tastes',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('embedding_sum', Vector(768), nullable=True),
+        sa.Column('favorites_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    # вкус по уже накопленному избранному; дальше его поддерживают ручки избранного
+    op.execute(
+        "INSERT INTO user_tastes (user_id, embedding_sum, favorites_count) "
+        "SELECT f.user_id, sum(p.embedding), count(*) "
+        "FROM favorites f JOIN places p ON p.id = f.place_id "
+        "WHERE p.embedding IS NOT NULL "
+        "GROUP BY f.user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_tastes')
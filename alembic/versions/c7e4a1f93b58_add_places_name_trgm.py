@@ -0,0 +1,42 @@
+"""add_places_name_trgm
+
+Revision ID: c7e4a1f93b58
+Revises: b8f1d2e6c4a7
+Create Date: 2026-10-18 19:12:47.205318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e4a1f93b58'
+down_revision: Union[str, Sequence[str], None] = 'b8f1d2e6c4a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        # btree ix_places_name годится только для равенства и 'abc%' в C-локали;
+        # триграммы обслуживают ILIKE '%...%' и similarity (опечатки)
+        op.create_index(
+            'ix_places_name_trgm',
+            'places',
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_name_trgm")
@@ -0,0 +1,74 @@
+"""places_version_commit_order
+
+Revision ID: d2b6f8a4c915
+Revises: c7e4a1f93b58
+Create Date: 2026-10-18 20:31:09.614022
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b6f8a4c915'
+down_revision: Union[str, Sequence[str], None] = 'c7e4a1f93b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# те же колонки, что у places_bump_version (a51d6c0e8b27)
+SYNCED_COLUMNS = (
+    "name", "city", "type", "price", "description", "search_context",
+    "image_url", "image_srcset", "lat", "lon", "deleted_at",
+)
+
+# ключ pg_advisory_xact_lock: один на всю таблицу places
+VERSION_LOCK = 718204
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # nextval() в BEFORE-триггере выдает версии в порядке записи, а видимыми строки
+    # становятся в порядке коммитов. Чанк импорта с версией N может закоммититься
+    # после create_place с N+1, и клиент с since=N+1 строку N уже не получит.
+    # Поэтому перед самым коммитом версия выдается заново под блокировкой: она
+    # держится до конца коммита, и следующий писатель получит номер только после
+    # того, как строки предыдущего стали видны
+    op.execute(
+        f"""
+        CREATE FUNCTION places_commit_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock({VERSION_LOCK});
+            UPDATE places SET version = nextval('places_version_seq') WHERE id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    old_row = ", ".join(f"OLD.{column}" for column in SYNCED_COLUMNS)
+    new_row = ", ".join(f"NEW.{column}" for column in SYNCED_COLUMNS)
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER places_commit_version_insert AFTER INSERT ON places
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION places_commit_version()
+        """
+    )
+    # UPDATE из самой функции меняет только version - под WHEN не попадает и не зацикливается
+    op.execute(
+        f"""
+        CREATE CONSTRAINT TRIGGER places_commit_version_update AFTER UPDATE ON places
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW WHEN (({old_row}) IS DISTINCT FROM ({new_row}))
+        EXECUTE FUNCTION places_commit_version()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER places_commit_version_update ON places")
+    op.execute("DROP TRIGGER places_commit_version_insert ON places")
+    op.execute("DROP FUNCTION places_commit_version()")
@@ -0,0 +1,41 @@
+"""add_place_neighbors
+
+Revision ID: e3a9c4b7d215
+Revises: 6d2c8e4f1a93
+Create Date: 2026-10-18 17:05:12.730418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c4b7d215'
+down_revision: Union[str, Sequence[str], None] = '6d2c8e4f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # таблица пустая: заполнить по уже загруженным местам - python neighbors.py
+    op.create_table(
+        'place_neighbors',
+        sa.Column('place_id', sa.Integer(), nullable=False),
+        sa.Column('neighbor_id', sa.Integer(), nullable=False),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['place_id'], ['places.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['neighbor_id'], ['places.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('place_id', 'neighbor_id'),
+    )
+    op.create_index('ix_place_neighbors_place_distance', 'place_neighbors', ['place_id', 'distance'], unique=False)
+    op.create_index('ix_place_neighbors_neighbor', 'place_neighbors', ['neighbor_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_place_neighbors_neighbor', table_name='place_neighbors')
+    op.drop_index('ix_place_neighbors_place_distance', table_name='place_neighbors')
+    op.drop_table('place_neighbors')
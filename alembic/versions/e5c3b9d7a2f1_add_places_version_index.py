@@ -0,0 +1,32 @@
+"""add_places_version_index
+
+Revision ID: e5c3b9d7a2f1
+Revises: d2b6f8a4c915
+Create Date: 2026-10-18 21:04:52.118730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c3b9d7a2f1'
+down_revision: Union[str, Sequence[str], None] = 'd2b6f8a4c915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        # version > :v без города (индексы автодополнения и numpy догоняют весь каталог):
+        # ix_places_city_version (city, version) тут не помогает, был бы seq scan
+        op.create_index('ix_places_version', 'places', ['version'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_version")
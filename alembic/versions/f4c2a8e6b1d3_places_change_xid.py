@@ -0,0 +1,146 @@
+"""places_change_xid
+
+Revision ID: f4c2a8e6b1d3
+Revises: e5c3b9d7a2f1
+Create Date: 2026-10-19 10:42:17.380614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2a8e6b1d3'
+down_revision: Union[str, Sequence[str], None] = 'e5c3b9d7a2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# те же колонки, что у places_bump_version (a51d6c0e8b27)
+SYNCED_COLUMNS = (
+    "name", "city", "type", "price", "description", "search_context",
+    "image_url", "image_srcset", "lat", "lon", "deleted_at",
+)
+
+CURRENT_XID = "pg_current_xact_id()::text::bigint"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # d2b6f8a4c915 переписывал версию вторым UPDATE перед коммитом под общей
+    # блокировкой: строка писалась дважды (со всеми индексами), а писатели шли
+    # по одному. Вместо этого строка помнит id своей транзакции (change_xid),
+    # а курсор синхронизации - xmin снимка: транзакции с меньшим id уже
+    # завершены, так что закоммиченное позже курсора меньше него не бывает
+    op.execute("DROP TRIGGER places_commit_version_update ON places")
+    op.execute("DROP TRIGGER places_commit_version_insert ON places")
+    op.execute("DROP FUNCTION places_commit_version()")
+
+    # константный default не переписывает таблицу; старые строки - "давно"
+    op.add_column('places', sa.Column('change_xid', sa.BigInteger(), server_default='0', nullable=False))
+    op.alter_column('places', 'change_xid', server_default=sa.text(CURRENT_XID))
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION places_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('places_version_seq');
+            NEW.updated_at := now();
+            NEW.change_xid := {CURRENT_XID};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+    # TRUNCATE ... RESTART IDENTITY (seed.py) больше не сбрасывает версии
+    op.execute("ALTER SEQUENCE places_version_seq OWNED BY NONE")
+    # эпоха каталога: TRUNCATE стирает строки без надгробий и переиспользует id,
+    # курсоры прошлой эпохи недействительны - клиент получает полный снимок
+    op.execute("CREATE SEQUENCE places_epoch_seq")
+    op.execute("SELECT setval('places_epoch_seq', 1)")
+    op.execute(
+        """
+        CREATE FUNCTION places_new_epoch() RETURNS trigger AS $$
+        BEGIN
+            PERFORM nextval('places_epoch_seq');
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER places_new_epoch AFTER TRUNCATE ON places
+        FOR EACH STATEMENT EXECUTE FUNCTION places_new_epoch()
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_places_city_change_xid', 'places', ['city', 'change_xid'], unique=False, postgresql_concurrently=True
+        )
+        op.create_index('ix_places_change_xid', 'places', ['change_xid'], unique=False, postgresql_concurrently=True)
+        # по версии больше никто не ищет
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_city_version")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_version")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_places_version', 'places', ['version'], unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_places_city_version', 'places', ['city', 'version'], unique=False, postgresql_concurrently=True
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_change_xid")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_places_city_change_xid")
+
+    op.execute("DROP TRIGGER places_new_epoch ON places")
+    op.execute("DROP FUNCTION places_new_epoch()")
+    op.execute("DROP SEQUENCE places_epoch_seq")
+    op.execute("ALTER SEQUENCE places_version_seq OWNED BY places.version")
+
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION places_bump_version() RETURNS trigger AS $$
+        BEGIN
+            NEW.version := nextval('places_version_seq');
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.drop_column('places', 'change_xid')
+
+    # как в d2b6f8a4c915
+    op.execute(
+        """
+        CREATE FUNCTION places_commit_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(718204);
+            UPDATE places SET version = nextval('places_version_seq') WHERE id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    old_row = ", ".join(f"OLD.{column}" for column in SYNCED_COLUMNS)
+    new_row = ", ".join(f"NEW.{column}" for column in SYNCED_COLUMNS)
+    op.execute(
+        """
+        CREATE CONSTRAINT TRIGGER places_commit_version_insert AFTER INSERT ON places
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION places_commit_version()
+        """
+    )
+    op.execute(
+        f"""
+        CREATE CONSTRAINT TRIGGER places_commit_version_update AFTER UPDATE ON places
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW WHEN (({old_row}) IS DISTINCT FROM ({new_row}))
+        EXECUTE FUNCTION places_commit_version()
+        """
+    )
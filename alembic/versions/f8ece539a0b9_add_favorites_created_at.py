@@ -0,0 +1,30 @@
+"""add_favorites_created_at
+
+Revision ID: f8ece539a0b9
+Revises: 40be08877045
+Create Date: 2026-10-18 13:02:44.176520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8ece539a0b9'
+down_revision: Union[str, Sequence[str], None] = '40be08877045'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('favorites', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_favorites_user_created', 'favorites', ['user_id', 'created_at', 'place_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_favorites_user_created', table_name='favorites')
+    op.drop_column('favorites', 'created_at')
@@ -7,6 +7,8 @@ from pydantic import BaseModel
 from app.core.database import get_db
 from app.models.user import User
 from app.core.security import verify_password, get_password_hash, create_access_token, SECRET_KEY, ALGORITHM
+from app.services.user_cache import user_cache
+from app.core.metrics import stage_seconds
 import jwt
 
 router = APIRouter()
@@ -32,13 +34,14 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     new_user = User(
         email=user_in.email,
         username=user_in.email.split('@')[0],
-        hashed_password=get_password_hash(user_in.password)
+        hashed_password=get_password_hash(user_in.password),
+        token_version=0
     )
     db.add(new_user)
     await db.commit()
     
 
-    token = create_access_token({"sub": new_user.email})
+    token = create_access_token({"sub": new_user.email, "ver": new_user.token_version})
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
@@ -50,11 +53,16 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
     if not user or not verify_password(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
-    token = create_access_token({"sub": user.email})
+    token = create_access_token({"sub": user.email, "ver": user.token_version})
     return {"access_token": token, "token_type": "bearer"}
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    with stage_seconds.time("auth"):
+        return await _resolve_user(token, db)
+
+
+async def _resolve_user(token: str, db: AsyncSession) -> User:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -62,9 +70,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
             raise HTTPException(status_code=401, detail="Invalid token")
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
-        
+
+    # токены, выданные до появления версии, считаем версией 0
+    token_version = payload.get("ver", 0)
+
+    cached = user_cache.get(email)
+    if cached is not None:
+        # отозванный токен режем без похода в БД
+        if token_version < cached["token_version"]:
+            raise HTTPException(status_code=401, detail="Token revoked")
+        if token_version == cached["token_version"]:
+            return user_cache.to_user(cached)
+        # токен новее кэша (версию подняли на другом воркере) - кэш устарел, идем в БД
+
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalars().first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
+    user_cache.put(user)
+    if token_version != user.token_version:
+        raise HTTPException(status_code=401, detail="Token revoked")
     return user
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services import ml_service
+from app.services.vector_index import vector_index
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def live():
+    """Процесс жив и отвечает (модель может еще грузиться)""" #для сваги
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready():
+    """Готов ли /search/ai: модель загружена и прогрета, БД доступна""" #для сваги
+    checks = {
+        "model": ml_service.is_model_ready(),
+        "database": True,
+    }
+    if settings.SEARCH_BACKEND == "numpy":
+        checks["vector_index"] = vector_index.ready
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+    except Exception:
+        checks["database"] = False
+
+    body = {
+        "status": "ready" if all(checks.values()) else "starting",
+        "checks": checks,
+        "model_load_seconds": ml_service.model_load_seconds,
+        "model_error": ml_service.model_error,
+    }
+    return JSONResponse(body, status_code=200 if all(checks.values()) else 503)
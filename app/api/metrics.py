@@ -0,0 +1,47 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.database import engine, read_router
+from app.core.metrics import render_counter, render_gauges, request_seconds, stage_seconds
+from app.services import ml_service
+from app.services.search_cache import search_cache
+from app.services.user_cache import user_cache
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text format: гистограммы стадий + текущие очереди, пул и кэши"""
+    pool = engine.pool
+    embedding_cache = ml_service.get_cache_stats()
+    users = user_cache.stats()
+    admission = ml_service.get_admission_stats()
+
+    gauges = {
+        "tourguide_embedding_queue_depth": ("Тексты, ждущие сборки батча", ml_service.batcher.queue_depth()),
+        "tourguide_executor_queue_depth": ("Батчи, ждущие поток модели", ml_service.executor_queue_depth()),
+        "tourguide_admission_queue_depth": ("Запросы в очереди на вход в ML-путь", admission["queue_depth"]),
+        "tourguide_admission_active": ("Вычисления эмбеддингов, идущие сейчас", admission["active"]),
+        "tourguide_model_ready": ("Модель загружена и прогрета", ml_service.is_model_ready()),
+        "tourguide_db_pool_size": ("Размер пула соединений", pool.size()),
+        "tourguide_db_pool_checked_out": ("Соединения, выданные запросам", pool.checkedout()),
+        "tourguide_db_pool_overflow": ("Соединения сверх pool_size", pool.overflow()),
+        "tourguide_db_replicas_healthy": ("Реплики для чтения, доступные сейчас", read_router.healthy_replicas()),
+        "tourguide_embedding_cache_hit_ratio": ("Доля попаданий в кэш эмбеддингов", embedding_cache["hit_ratio"]),
+        "tourguide_embedding_cache_size": ("Векторов в LRU кэша эмбеддингов", embedding_cache["memory_size"]),
+        "tourguide_user_cache_hit_ratio": ("Доля попаданий в кэш пользователей", users["hit_ratio"]),
+    }
+    if ml_service.embedding_client is not None:
+        gauges["tourguide_embedding_server_available"] = (
+            "Сервер эмбеддингов отвечает (0 - считаем в процессе)",
+            ml_service.embedding_client.ready and ml_service.embedding_client.available,
+        )
+    if search_cache is not None:
+        gauges["tourguide_search_cache_hit_ratio"] = ("Доля попаданий в кэш результатов поиска", search_cache.stats()["hit_ratio"])
+
+    lines = stage_seconds.render() + request_seconds.render() + render_gauges(gauges)
+    lines += render_counter(
+        "tourguide_admission_rejected_total", "Отказы 503 из-за перегрузки ML-пути", "priority", admission["rejected"]
+    )
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
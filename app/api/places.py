@@ -1,18 +1,56 @@
-from fastapi import APIRouter, Depends
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
 
-from app.core.database import get_db
-from app.models.place import Place
-from app.schemas.place import PlaceCreate, PlaceResponse, SearchRequest, FilterRequest
-from app.services.ml_service import get_embedding
-from typing import Optional
+from app.api.auth import get_current_user
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, read_router
+from app.core.log import sampled, log_event
+from app.core.metrics import stage_seconds
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE, place_neighbors_table
+from app.schemas.place import PlaceCreate, PlaceResponse, SearchRequest, FilterRequest, NearbyRequest, NearbyPlaceResponse, SuggestResponse
+from app.services.ml_service import get_embedding, is_model_ready
+from app.services.admission import Overloaded
+from app.services.embedding_client import EmbeddingServerUnavailable
+from app.services.embedding_cache import normalize_text
+from app.services.search_cache import search_cache
+from app.services.images import image_processor
+from app.services.vector_search import nearest_places, search_threshold, model_tag
+from app.services.vector_index import vector_index
+from app.services.ingest import ingest, iter_lines, iter_records, content_hash, place_key, IngestStats, LineTooLong, MAX_CHUNK_SIZE
+from app.services import geo
+from app.services import text_search
+from app.services.export import export_lines, parse_since
+from app.services.neighbors import update_neighbors
+from app.services.suggest import suggest_index, suggest_key, db_suggest
+from typing import Literal, Optional
 
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+place_list = TypeAdapter(list[PlaceResponse])
+nearby_place_list = TypeAdapter(list[NearbyPlaceResponse])
+suggest_list = TypeAdapter(list[SuggestResponse])
+
+def _json_response(adapter: TypeAdapter, rows) -> Response:
+    # сериализуем сами: стадия видна в метриках, а FastAPI не валидирует ответ второй раз
+    with stage_seconds.time("serialize"):
+        return Response(adapter.dump_json(adapter.validate_python(rows)), media_type="application/json")
 
-@router.post("/", response_model=PlaceResponse)
+def require_model():
+    # модель грузится в фоне после старта, до этого поиск честно отвечает 503
+    if not is_model_ready():
+        raise HTTPException(status_code=503, detail="Модель еще загружается", headers={"Retry-After": "5"})
+
+@router.post("/", response_model=PlaceResponse, dependencies=[Depends(require_model)])
 async def create_place(place_in: PlaceCreate, db: AsyncSession = Depends(get_db)):
     """Добавить новое место в базу (автоматически векторизует описание)""" #для сваги
 
@@ -20,70 +58,385 @@ async def create_place(place_in: PlaceCreate, db: AsyncSession = Depends(get_db)
 
     # vector = get_embedding(place_in.description)
     vector = await get_embedding(text_to_embed)
+    [image_srcset] = await image_processor.srcsets([place_in.image_url])
     
     new_place = Place(
         name=place_in.name,
         city=place_in.city,
         type=place_in.type,
+        price=place_in.price,
         description=place_in.description,
+        image_url=place_in.image_url,
+        image_srcset=image_srcset,
+        lat=place_in.lat,
+        lon=place_in.lon,
         search_context=text_to_embed,
+        # тот же ключ, что у импорта: повторный /bulk обновит это место, а не задвоит
+        external_id=place_key(place_in.model_dump()),
+        content_hash=content_hash(text_to_embed),
         embedding=vector
     )
     
     db.add(new_place)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Место с таким названием в этом городе уже есть")
     await db.refresh(new_place)
+
+    if settings.SIMILAR_UPDATE_ON_WRITE:
+        await update_neighbors(db, [new_place.id])
+        await db.commit()
+
+    if vector_index.ready:
+        vector_index.add(new_place.id, new_place.city, vector)
+    if suggest_index.ready:
+        await suggest_index.refresh(db)
+    if search_cache is not None:
+        await search_cache.invalidate([new_place.city])
     return new_place
 
-SEARCH_THRESHOLD = 1.112
+@router.post("/bulk", dependencies=[Depends(get_current_user)])
+async def bulk_create_places(
+    request: Request,
+    format: Literal["jsonl", "csv"] = Query("jsonl"),
+    chunk_size: int = Query(500, ge=1, le=MAX_CHUNK_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    """Массовый импорт: тело запроса - JSONL или CSV, читается потоком по чанкам.
+
+    Битые строки пропускаются и считаются в invalid (первые причины - в errors)
+    """ #для сваги
+
+    records = iter_records(iter_lines(request.stream()), format)
+    stats = IngestStats()
+    try:
+        await ingest(db, records, chunk_size, stats=stats)
+    except LineTooLong as e:
+        # чанки до этой строки уже закоммичены - говорим, сколько успело
+        raise HTTPException(status_code=413, detail=f"{e}; импортировано до обрыва: {stats.total}")
+    finally:
+        # чанки, закоммиченные до обрыва, тоже должны дойти до индексов и кэша
+        await db.rollback()
+        if vector_index.ready:
+            await vector_index.refresh(db)
+        if suggest_index.ready:
+            await suggest_index.refresh(db)
+        if search_cache is not None:
+            await search_cache.invalidate(stats.cities, stats.updated_ids)
+    return stats.as_dict()
+
+class Degraded(list):
+    """Неполный результат (модель еще грузится, ML-путь перегружен): отдаем, но не кэшируем"""
+
+async def _cached(db: AsyncSession, kind: str, params: dict, city: str | None, run):
+    """Результат поиска из кэша по версии каталога города, иначе run() и запомнить"""
+    if search_cache is None:
+        return await run()
+
+    key, ids = await search_cache.lookup(kind, params, city)
+    if ids is not None:
+        return await search_cache.hydrate(db, ids)
+
+    rows = await run()
+    # иначе урезанный список пережил бы прогрев модели до TTL
+    if not isinstance(rows, Degraded):
+        await search_cache.store(key, rows)
+    return rows
+
+@router.delete("/{place_id}", dependencies=[Depends(get_current_user)])
+async def delete_place(place_id: int, db: AsyncSession = Depends(get_db)):
+    """Мягкое удаление: место пропадает из поиска, а клиенты с офлайн-копией получат надгробие""" #для сваги
+
+    result = await db.execute(
+        update(Place)
+        .where(Place.id == place_id, PLACE_IS_LIVE)
+        .values(deleted_at=func.now())
+        .returning(Place.city)
+    )
+    city = result.scalar()
+    if city is None:
+        raise HTTPException(status_code=404, detail="Place not found")
+    if settings.SIMILAR_UPDATE_ON_WRITE:
+        # место уходит из чужих списков "похожих", они пересчитываются без него
+        await update_neighbors(db, [place_id])
+    await db.commit()
+
+    if vector_index.ready:
+        vector_index.remove(place_id)
+    if suggest_index.ready:
+        await suggest_index.refresh(db)
+    if search_cache is not None:
+        await search_cache.invalidate([city], [place_id])
+    return {"status": "deleted"}
+
+@router.get("/{place_id}/similar", response_model=list[PlaceResponse])
+async def similar_places(
+    place_id: int,
+    limit: int = Query(10, ge=1, le=settings.SIMILAR_NEIGHBORS),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Похожие места для карточки: готовый список соседей из place_neighbors""" #для сваги
+
+    stmt = (
+        select(*PLACE_RESPONSE_COLUMNS)
+        .join(place_neighbors_table, place_neighbors_table.c.neighbor_id == Place.id)
+        .where(place_neighbors_table.c.place_id == place_id, PLACE_IS_LIVE)
+        .order_by(place_neighbors_table.c.distance)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return _json_response(place_list, result.all())
+
+@router.get("/export")
+async def export_places(
+    city: str,
+    since: str | None = Query(None, max_length=64, description="next_since прошлой выгрузки; без него - полный снимок"),
+):
+    """Каталог города потоком NDJSON для офлайн-копии: полный снимок или изменения после since""" #для сваги
+
+    try:
+        cursor = parse_since(since)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="since - значение next_since из прошлой выгрузки")
+    return StreamingResponse(export_lines(city, cursor), media_type="application/x-ndjson")
+
+@router.get("/suggest", response_model=list[SuggestResponse])
+async def suggest_places(
+    q: str = Query(..., min_length=1, max_length=100),
+    city: str = Query(...),
+    limit: int = Query(10, ge=1, le=20),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Автодополнение названий мест города: на каждое нажатие клавиши, без модели""" #для сваги
+
+    if suggest_index.ready:
+        rows = suggest_index.suggest(q, city, limit)
+        # по префиксу пусто - возможно, опечатка: это уже пойдет в БД
+        fuzzy = settings.SUGGEST_FUZZY_MIN_LENGTH and len(suggest_key(q)) >= settings.SUGGEST_FUZZY_MIN_LENGTH
+        if rows or not fuzzy:
+            return _json_response(suggest_list, rows)
+    # индекс еще собирается (или ищем опечатки) - GIN pg_trgm
+    return _json_response(suggest_list, await db_suggest(db, q, city, limit))
+
+async def _search_pgvector(
+    db: AsyncSession, query_vector: list[float], search_in: SearchRequest, max_distance: float | None = None
+):
+    return await nearest_places(
+        db,
+        query_vector,
+        search_in.limit,
+        search_in.city,
+        search_in.quality,
+        search_in.precision,
+        max_distance=max_distance,
+    )
+
+async def _search_numpy(
+    db: AsyncSession, query_vector: list[float], search_in: SearchRequest, max_distance: float | None = None
+):
+    # top-k считаем в памяти, из БД достаем только победителей (ближе порога)
+    hits = await vector_index.asearch(query_vector, search_in.city, search_in.limit)
+    if max_distance is not None:
+        hits = [(place_id, dist) for place_id, dist in hits if dist < max_distance]
+    if not hits:
+        return []
+
+    result = await db.execute(
+        select(*PLACE_RESPONSE_COLUMNS).where(Place.id.in_([place_id for place_id, _ in hits]), PLACE_IS_LIVE)
+    )
+    places = {row.id: row for row in result.all()}
+    return [(places[place_id], dist) for place_id, dist in hits if place_id in places]
+
+async def _search_nearby(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: int,
+    city: str | None = None,
+    place_type: str | None = None,
+    query_vector: list[float] | None = None,
+    distance_weight: float | None = None,
+):
+    """Кандидаты в радиусе по GiST-индексу, затем ранжирование смыслом + расстоянием"""
+    dist_m = geo.distance_m(lat, lon)
+
+    # ближайшие N в радиусе - kNN по индексу, дальше работаем только с ними
+    candidates = select(Place.id).where(geo.within_radius(lat, lon, radius_m), PLACE_IS_LIVE)
+    if city:
+        candidates = candidates.where(Place.city == city)
+    if place_type:
+        candidates = candidates.where(Place.type == place_type)
+    candidates = candidates.order_by(geo.nearest_first(lat, lon)).limit(max(settings.NEARBY_CANDIDATES, limit))
+
+    stmt = select(*PLACE_RESPONSE_COLUMNS, dist_m.label("distance_m")).where(Place.id.in_(candidates))
+
+    if query_vector is None:
+        stmt = stmt.order_by(dist_m)
+    else:
+        weight = settings.NEARBY_DISTANCE_WEIGHT if distance_weight is None else distance_weight
+        semantic = Place.embedding.cosine_distance(query_vector)
+        # обе части нормированы в [0, 1]: смысл - по порогу, расстояние - по радиусу
+        threshold = search_threshold()
+        score = (1 - weight) * semantic / threshold + weight * dist_m / float(radius_m)
+        stmt = stmt.where(semantic < threshold).order_by(score)
+
+    result = await db.execute(stmt.limit(limit))
+    return result.all()
+
+@router.post("/search/nearby", response_model=list[NearbyPlaceResponse])
+async def search_nearby(search_in: NearbyRequest, db: AsyncSession = Depends(get_read_db)):
+    """Рядом со мной: радиус вокруг точки, с запросом - смешанное ранжирование""" #для сваги
+
+    query_vector = None
+    if search_in.query:
+        # без запроса модель не нужна, поэтому проверяем готовность только тут
+        require_model()
+        query_vector = await get_embedding(search_in.query)
+
+    rows = await _search_nearby(
+        db,
+        search_in.lat,
+        search_in.lon,
+        search_in.radius_m,
+        search_in.limit,
+        city=search_in.city,
+        place_type=search_in.type,
+        query_vector=query_vector,
+        distance_weight=search_in.distance_weight,
+    )
+    return _json_response(nearby_place_list, rows)
+
+async def _search_vector(
+    db: AsyncSession, query_vector: list[float], search_in: SearchRequest, max_distance: float | None = None
+):
+    if settings.SEARCH_BACKEND == "numpy" and vector_index.ready:
+        return await _search_numpy(db, query_vector, search_in, max_distance)
+    return await _search_pgvector(db, query_vector, search_in, max_distance)
+
+async def _search_hybrid(db: AsyncSession, search_in: SearchRequest):
+    """Полнотекст + векторы параллельно, слияние через reciprocal rank fusion"""
+
+    # быстрый путь: все слова запроса есть в названии ("Эрмитаж") - модель не нужна
+    name_hits = await text_search.name_matches(db, search_in.query, search_in.city, search_in.limit)
+    if len(name_hits) >= search_in.limit:
+        return name_hits
+
+    def top_up(places):
+        # совпадения по названию остаются первыми, остальное место - из гибридной выдачи
+        seen = {place.id for place in name_hits}
+        rest = [place for place in places if place.id not in seen]
+        return list(name_hits) + rest[: search_in.limit - len(name_hits)]
+
+    candidates = max(settings.HYBRID_CANDIDATES, search_in.limit)
+
+    if not is_model_ready():
+        # модель еще грузится - отвечаем хотя бы лексикой
+        return Degraded(top_up(await text_search.lexical_matches(db, search_in.query, search_in.city, candidates)))
+
+    async def lexical():
+        # отдельная сессия (можно с другой реплики): одна AsyncSession не умеет два запроса одновременно
+        async with await read_router.session() as lexical_db:
+            return await text_search.lexical_matches(lexical_db, search_in.query, search_in.city, candidates)
+
+    async def semantic():
+        try:
+            query_vector = await get_embedding(search_in.query)
+        except (Overloaded, EmbeddingServerUnavailable):
+            # ML-путь перегружен или сервер эмбеддингов лежит - лексика все равно есть
+            return None
+        rows = await _search_vector(
+            db, query_vector, search_in.model_copy(update={"limit": candidates}), search_threshold()
+        )
+        return [place for place, dist in rows]
+
+    lexical_places, vector_places = await asyncio.gather(lexical(), semantic())
+    if vector_places is None:
+        return Degraded(top_up(lexical_places))
+
+    fused = text_search.reciprocal_rank_fusion(
+        [[place.id for place in lexical_places], [place.id for place in vector_places]],
+        k=settings.RRF_K,
+    )
+    places = {place.id: place for place in lexical_places + vector_places}
+    return top_up([places[place_id] for place_id in fused])
 
 @router.post("/search/ai", response_model=list[PlaceResponse])
-async def search_places(search_in: SearchRequest, db: AsyncSession = Depends(get_db)):
+async def search_places(search_in: SearchRequest, db: AsyncSession = Depends(get_read_db)):
     """Гибридный поиск: Фильтр SQL + Векторная близость""" #для сваги
-    
+
+    if search_in.lat is not None:
+        # точки почти не повторяются, поиск рядом не кэшируем
+        return _json_response(place_list, await _search_ai(db, search_in))
+
+    params = {
+        "query": normalize_text(search_in.query),
+        "city": search_in.city,
+        "limit": search_in.limit,
+        "quality": search_in.quality or settings.SEARCH_QUALITY,
+        "mode": search_in.mode or settings.SEARCH_MODE,
+        "precision": search_in.precision or settings.VECTOR_PRECISION,
+        "model": model_tag(),
+        "threshold": search_threshold(),
+    }
+    rows = await _cached(db, "ai", params, search_in.city, lambda: _search_ai(db, search_in))
+    return _json_response(place_list, rows)
+
+async def _search_ai(db: AsyncSession, search_in: SearchRequest):
+    if (search_in.mode or settings.SEARCH_MODE) == "hybrid" and search_in.lat is None:
+        return await _search_hybrid(db, search_in)
+
+    require_model()
     # query_vector = get_embedding(search_in.query)
     query_vector = await get_embedding(search_in.query)
 
-    distance_col = Place.embedding.l2_distance(query_vector).label("distance")
-    
-    stmt = select(Place, distance_col)
-    
-    if search_in.city:
-        stmt = stmt.where(Place.city == search_in.city)
-    
-    
-    stmt = stmt.order_by(distance_col).limit(search_in.limit)
-    
-    result = await db.execute(stmt)
-    rows = result.all() 
+    if search_in.lat is not None and search_in.lon is not None:
+        # порог уже применен в SQL
+        return await _search_nearby(
+            db,
+            search_in.lat,
+            search_in.lon,
+            search_in.radius_m,
+            search_in.limit,
+            city=search_in.city,
+            query_vector=query_vector,
+        )
 
-    found_places = []
-    
-    print(f"--- SEARCH DEBUG: '{search_in.query}' ---")
-    for place, dist in rows:
-        print(f"Candidate: {place.name}, Dist: {dist}")
+    # порог - в SQL: строки дальше него БД не отдает вовсе
+    rows = await _search_vector(db, query_vector, search_in, search_threshold())
 
-        if dist < SEARCH_THRESHOLD:
-            found_places.append(place)
-        else:
-            print(f"-> Skipped '{place.name}' (too far)")
+    # вместо print на каждый запрос - сэмплированное событие на DEBUG
+    if sampled(logger):
+        log_event(
+            logger,
+            "search",
+            query=search_in.query,
+            city=search_in.city,
+            found=[(place.name, round(float(dist), 4)) for place, dist in rows],
+        )
 
-    return found_places
+    return [place for place, dist in rows]
 
 @router.post("/search/filters", response_model=list[PlaceResponse])
 async def search_by_filters(
     search_in: FilterRequest, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    stmt = select(Place)
-    stmt = stmt.where(Place.city == search_in.city)
+    async def run():
+        stmt = select(*PLACE_RESPONSE_COLUMNS)
+        stmt = stmt.where(Place.city == search_in.city, PLACE_IS_LIVE)
 
-    if search_in.type:
-        stmt = stmt.where(Place.type == search_in.type)
+        if search_in.type:
+            stmt = stmt.where(Place.type == search_in.type)
+            
+        if search_in.price:
+            stmt = stmt.where(Place.price == search_in.price)
         
-    if search_in.price:
-        stmt = stmt.where(Place.price == search_in.price)
-    
-    stmt = stmt.limit(search_in.limit)
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+        stmt = stmt.limit(search_in.limit)
+        result = await db.execute(stmt)
+        return result.all()
+
+    rows = await _cached(db, "filters", search_in.model_dump(), search_in.city, run)
+    return _json_response(place_list, rows)
\ No newline at end of file
@@ -1,99 +1,210 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete, literal, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.core.database import get_db
-from app.models.user import User
-from app.models.place import Place
+from app.core.database import get_db, read_router
+from app.models.user import User, favorites_table
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE
 from app.api.auth import get_current_user
 from app.schemas.place import PlaceResponse
-from app.core.security import verify_password, get_password_hash
-from app.schemas.user import UserUpdate, UserResponse 
+from app.core.security import verify_password, get_password_hash, create_access_token
+from app.schemas.user import UserUpdate, UserResponse, UserUpdateResponse, FavoritesPage, FavoritesBulkRequest
+from app.services.user_cache import user_cache
+from app.services.recommendations import refresh_tastes, add_to_taste, remove_from_taste, recommend
 from sqlalchemy.future import select as select_future
 from app.schemas.user import UserResponse 
 
 router = APIRouter()
 
+async def get_user_read_db(request: Request, current_user: User = Depends(get_current_user)):
+    # чтение с реплики, но сразу после своих изменений - с primary (read-your-writes)
+    session = await read_router.session(sticky=read_router.is_sticky(request))
+    try:
+        yield session
+    finally:
+        await session.close()
+
+def encode_cursor(created_at: datetime, place_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{place_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, place_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(place_id)
+    except Exception as e:
+        raise ValueError("bad cursor") from e
+
+def _favorites_query(user_id: int):
+    # только колонки PlaceResponse, без ORM-объектов и векторов
+    return (
+        select(*PLACE_RESPONSE_COLUMNS, favorites_table.c.created_at)
+        .join(favorites_table, favorites_table.c.place_id == Place.id)
+        .where(favorites_table.c.user_id == user_id, PLACE_IS_LIVE)
+    )
+
 # Получить профиль + список избранного
 @router.get("/me")
 async def read_users_me(
     current_user: User = Depends(get_current_user), 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_user_read_db)
 ):
-    stmt = (
-        select(User)
-        .where(User.id == current_user.id)
-        .options(
-            selectinload(User.favorites)
-        )
-    )
+    # профиль уже есть в current_user, из БД достаем только избранное
+    stmt = _favorites_query(current_user.id).order_by(favorites_table.c.created_at, Place.id)
     result = await db.execute(stmt)
-    
-    user_with_favs = result.scalars().unique().first() 
-    
-    if not user_with_favs:
-        raise HTTPException(status_code=404, detail="User not found")
         
     return {
-        "email": user_with_favs.email,
-        "id": user_with_favs.id,
-        "username": user_with_favs.username,
+        "email": current_user.email,
+        "id": current_user.id,
+        "username": current_user.username,
         "favorites": [
             
-            PlaceResponse.model_validate(place).model_dump()
-            for place in user_with_favs.favorites
+            PlaceResponse.model_validate(row).model_dump()
+            for row in result.all()
         ]
     }
 
+# Избранное постранично (keyset: новые сверху)
+@router.get("/me/favorites", response_model=FavoritesPage)
+async def list_favorites(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_user_read_db)
+):
+    stmt = _favorites_query(current_user.id)
+
+    if cursor:
+        try:
+            created_at, place_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # (created_at, place_id) < курсора - идет по индексу ix_favorites_user_created
+        stmt = stmt.where(
+            tuple_(favorites_table.c.created_at, favorites_table.c.place_id) < tuple_(created_at, place_id)
+        )
+
+    stmt = stmt.order_by(favorites_table.c.created_at.desc(), favorites_table.c.place_id.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return FavoritesPage(
+        items=[PlaceResponse.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+# Лента рекомендаций: ближайшие ко вкусу (центроиду избранного) места, кроме уже избранных
+@router.get("/me/recommendations", response_model=list[PlaceResponse])
+async def read_recommendations(
+    limit: int = Query(20, ge=1, le=100),
+    city: str | None = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_user_read_db)
+):
+    return await recommend(db, current_user.id, limit, city)
+
+# Массово добавить/убрать избранное (по одному запросу на каждое действие)
+@router.post("/favorites/bulk")
+async def bulk_update_favorites(
+    bulk_in: FavoritesBulkRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    added = removed = 0
+
+    if bulk_in.add:
+        # несуществующие id просто отсеиваются в SELECT
+        stmt = pg_insert(favorites_table).from_select(
+            ["user_id", "place_id"],
+            select(literal(current_user.id), Place.id).where(Place.id.in_(bulk_in.add), PLACE_IS_LIVE),
+        ).on_conflict_do_nothing().returning(favorites_table.c.place_id)
+        added_ids = list((await db.execute(stmt)).scalars())
+        added = len(added_ids)
+
+    if bulk_in.remove:
+        stmt = delete(favorites_table).where(
+            favorites_table.c.user_id == current_user.id,
+            favorites_table.c.place_id.in_(bulk_in.remove),
+        ).returning(favorites_table.c.place_id)
+        removed_ids = list((await db.execute(stmt)).scalars())
+        removed = len(removed_ids)
+
+    # вкус пересчитываем, только если избранное реально изменилось (повторы отсеял ON CONFLICT)
+    if added or removed:
+        await refresh_tastes(db, [current_user.id])
+    await db.commit()
+    read_router.mark_write(response)
+    return {"added": added, "removed": removed}
+
 # Добавить в избранное
 @router.post("/favorites/{place_id}")
 async def add_favorite(
     place_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    
-    place = await db.get(Place, place_id)
-    if not place:
-        raise HTTPException(status_code=404, detail="Place not found")
-    
-    
-    stmt = select(User).where(User.id == current_user.id).options(selectinload(User.favorites))
-    result = await db.execute(stmt)
-    user = result.scalars().first()
-    
-    if place not in user.favorites:
-        user.favorites.append(place)
-        await db.commit()
-        
+    # один INSERT ... SELECT: удаленное (надгробие) место внешний ключ не отсеет, фильтр - да.
+    # FOR SHARE держит место живым до коммита - тот же порядок блокировок, что в add_to_taste
+    stmt = pg_insert(favorites_table).from_select(
+        ["user_id", "place_id"],
+        select(literal(current_user.id), Place.id)
+        .where(Place.id == place_id, PLACE_IS_LIVE)
+        .with_for_update(read=True),
+    ).on_conflict_do_nothing().returning(favorites_table.c.place_id)
+    added_ids = list((await db.execute(stmt)).scalars())
+    if added_ids:
+        # вкус обновляем в той же транзакции: сумма всегда совпадает с избранным
+        await add_to_taste(db, current_user.id, place_id)
+    else:
+        # ничего не вставили: либо уже в избранном, либо места нет
+        live = await db.scalar(select(Place.id).where(Place.id == place_id, PLACE_IS_LIVE))
+        if live is None:
+            await db.rollback()
+            raise HTTPException(status_code=404, detail="Place not found")
+    await db.commit()
+
+    read_router.mark_write(response)
     return {"status": "added"}
 
 
 @router.delete("/favorites/{place_id}")
 async def remove_favorite(
     place_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    stmt = select(User).where(User.id == current_user.id).options(selectinload(User.favorites))
-    result = await db.execute(stmt)
-    user = result.scalars().first()
-    
-    
-    user.favorites = [p for p in user.favorites if p.id != place_id]
+    stmt = delete(favorites_table).where(
+        favorites_table.c.user_id == current_user.id,
+        favorites_table.c.place_id == place_id,
+    ).returning(favorites_table.c.place_id)
+    removed_ids = list((await db.execute(stmt)).scalars())
+    if removed_ids:
+        await remove_from_taste(db, current_user.id, place_id)
     await db.commit()
+    read_router.mark_write(response)
     
     return {"status": "removed"}
 
 # Обновление профиля
-@router.put("/me/update", response_model=UserResponse)
+@router.put("/me/update", response_model=UserUpdateResponse)
 async def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    if user_update.old_password or user_update.new_password:
+    password_changed = bool(user_update.old_password or user_update.new_password)
+    if password_changed:
         if not user_update.old_password or not user_update.new_password:
             raise HTTPException(status_code=400, detail="Для смены пароля нужны оба поля: старый и новый.")
         
@@ -101,6 +212,8 @@ async def update_user_profile(
             raise HTTPException(status_code=400, detail="Старый пароль неверен.")
         
         current_user.hashed_password = get_password_hash(user_update.new_password)
+        # все выданные ранее токены становятся недействительными
+        current_user.token_version = User.token_version + 1
      
     if user_update.username:
         current_user.username = user_update.username
@@ -108,5 +221,12 @@ async def update_user_profile(
     db.add(current_user)
     await db.commit()
     await db.refresh(current_user)
-    
-    return current_user
\ No newline at end of file
+
+    # кладем свежий снапшот (а не просто удаляем): так старые токены
+    # отсекаются по версии без запроса в БД
+    user_cache.put(current_user)
+
+    response = UserUpdateResponse.model_validate(current_user)
+    if password_changed:
+        response.access_token = create_access_token({"sub": current_user.email, "ver": current_user.token_version})
+    return response
\ No newline at end of file
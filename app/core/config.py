@@ -1,7 +1,143 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # SQL в stdout - только для отладки, на горячем пути это синхронный I/O
+    DB_ECHO: bool = False
+
+    # Пул соединений (на каждый воркер и на каждую реплику отдельно)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800  # секунды; меньше idle-таймаута балансировщика/pgbouncer
+    # пинг на каждый checkout - лишний round-trip на запрос; мертвые соединения и так
+    # отсекает DB_POOL_RECYCLE, а разрыв посреди запроса пинг все равно не спасает
+    DB_POOL_PRE_PING: bool = False
+    # кэш prepared statements asyncpg на соединение; 0 - для pgbouncer в режиме transaction
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
+    # Реплики для чтения (через запятую): поиск, фильтры, /me. Пусто - все идет в primary
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_RETRY_SECONDS: float = 30  # сколько не трогать реплику после ошибки соединения
+    # после изменения избранного читаем этого пользователя с primary (догоняем лаг реплики)
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    EMBEDDING_MODEL: str = "paraphrase-multilingual-mpnet-base-v2"
+    # torch - эталон; onnx - int8-квантованный экспорт (python export_onnx.py);
+    # fake - детерминированные векторы без модели (бенчмарки, см. benchmarks/)
+    EMBEDDING_BACKEND: Literal["torch", "onnx", "onnx-fp32", "fake"] = "torch"
+    ONNX_MODEL_DIR: str = "data/onnx"
+    ONNX_THREADS: int = 0  # 0 - решает onnxruntime
+    # грузить модель только из локального кэша HF (в хаб идем, только если кэш пуст)
+    HF_OFFLINE: bool = True
+
+    # Батчинг запросов к модели
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_WORKERS: int = 2
+
+    # Вход в ML-путь (app/services/admission.py): сколько вычислений эмбеддинга идут
+    # одновременно (0 - без ограничений), сколько ждут в очереди и сколько секунд
+    # готов ждать каждый класс. Не успевает к дедлайну - сразу 503 + Retry-After
+    ADMISSION_CONCURRENCY: int = 64
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_INTERACTIVE_DEADLINE: float = 2.0  # поиск и запись мест из API
+    ADMISSION_BACKGROUND_DEADLINE: float = 60.0  # импорт (get_embeddings)
+
+    # Общий сервер эмбеддингов (python -m app.services.embedding_server): одна модель
+    # на хост вместо копии в каждом воркере uvicorn. Пусто - модель в процессе
+    EMBEDDING_SERVER_SOCKET: str = ""
+    EMBEDDING_SERVER_POOL_SIZE: int = 8  # соединений на воркер
+    EMBEDDING_SERVER_TIMEOUT: float = 5
+    EMBEDDING_SERVER_RETRY_SECONDS: float = 10  # сколько не трогать сервер после сбоя
+    EMBEDDING_SERVER_STARTUP_TIMEOUT: float = 60  # сколько ждать готовности сервера на старте
+    # сервер не отвечает дольше EMBEDDING_SERVER_FALLBACK_AFTER секунд - грузим свою модель
+    # и считаем в процессе (когда сервер вернется, она выгружается). Короткий сбой или
+    # перезапуск сервера - 503 + Retry-After, а не копия модели в каждом воркере
+    EMBEDDING_SERVER_FALLBACK: bool = True
+    EMBEDDING_SERVER_FALLBACK_AFTER: float = 60
+
+    # Кэш эмбеддингов (TTL в секундах, 0 - без TTL; путь к sqlite - опционально)
+    EMBEDDING_CACHE_SIZE: int = 10_000
+    EMBEDDING_CACHE_TTL: float = 0
+    EMBEDDING_CACHE_PATH: str | None = None
+
+    # ANN-индекс по places.embedding и ручки качества/скорости поиска
+    VECTOR_INDEX: Literal["hnsw", "ivfflat"] = "hnsw"
+    IVFFLAT_LISTS: int = 100
+    SEARCH_QUALITY: Literal["fast", "balanced", "accurate"] = "balanced"
+    HNSW_EF_SEARCH: int = 40
+    IVFFLAT_PROBES: int = 10
+    # pgvector >= 0.8; "off" - вместо iterative scan берем кандидатов с запасом
+    VECTOR_ITERATIVE_SCAN: Literal["off", "strict_order", "relaxed_order"] = "strict_order"
+    VECTOR_OVERFETCH: int = 10
+    # Порог косинусного расстояния /search/ai (в SQL WHERE): дальше - не результат.
+    # 0.618 - бывший порог L2 1.112 для нормированных векторов (cos = l2^2 / 2).
+    # Подбирается python -m benchmarks.search_quality; у каждой модели свой -
+    # SEARCH_THRESHOLDS='{"модель:бэкенд": порог}' перекрывает общий
+    SEARCH_THRESHOLD: float = 0.618
+    SEARCH_THRESHOLDS: dict[str, float] = {}
+    # Точность векторного поиска (pgvector >= 0.7): full - HNSW по float32;
+    # halfvec - HNSW по float16-копии; binary - шорт-лист по Хэммингу из
+    # limit * BINARY_RERANK_FACTOR кандидатов и точный пересчет по embedding
+    VECTOR_PRECISION: Literal["full", "halfvec", "binary"] = "full"
+    BINARY_RERANK_FACTOR: int = 10
+
+    # Бэкенд top-k для /search/ai: pgvector или in-process numpy-матрица
+    SEARCH_BACKEND: Literal["pgvector", "numpy"] = "pgvector"
+    VECTOR_SNAPSHOT_DIR: str = "data/vector_index"
+    VECTOR_INDEX_REFRESH_SECONDS: float = 30
+
+    # "Похожие места" (/places/{id}/similar): top-N соседей каждого места в place_neighbors
+    SIMILAR_NEIGHBORS: int = 20
+    SIMILAR_SAME_CITY: bool = True
+    SIMILAR_BATCH_SIZE: int = 512  # мест на одно умножение матриц при полной пересборке
+    # обновлять списки при записи мест; False - только полная пересборка (python neighbors.py)
+    SIMILAR_UPDATE_ON_WRITE: bool = True
+    # в чьи списки попадает новое место, ищем среди его N * factor ближайших
+    SIMILAR_REVERSE_FACTOR: int = 4
+
+    # Автодополнение названий (/places/suggest): индекс в памяти по городам, догоняет
+    # каталог раз в SUGGEST_REFRESH_SECONDS; по префиксу пусто - ищем опечатки через
+    # pg_trgm в БД, если в запросе не меньше SUGGEST_FUZZY_MIN_LENGTH символов (0 - не ищем)
+    SUGGEST_REFRESH_SECONDS: float = 10
+    SUGGEST_FUZZY_MIN_LENGTH: int = 3
+
+    # vector - только эмбеддинги; hybrid - полнотекст + эмбеддинги (RRF) и быстрый путь по названию
+    SEARCH_MODE: Literal["vector", "hybrid"] = "vector"
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+
+    # Поиск рядом: вес расстояния в итоговом скоре (0 - только смысл, 1 - только расстояние)
+    NEARBY_DISTANCE_WEIGHT: float = 0.3
+    NEARBY_CANDIDATES: int = 200
+
+    # Кэш пользователей в get_current_user (секунды)
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 30
+
+    # Кэш результатов поиска (id мест) с версиями каталога по городам;
+    # redis - общий (SEARCH_CACHE_URL=redis://...): версии видят все воркеры и CLI.
+    # local - версии в памяти процесса, запись из другого воркера или ingest.py
+    # его не сбросит: только для одного воркера без импорта в фоне
+    SEARCH_CACHE_BACKEND: Literal["off", "local", "redis"] = "off"
+    SEARCH_CACHE_URL: str | None = None
+    SEARCH_CACHE_SIZE: int = 10_000
+    SEARCH_CACHE_TTL: float = 300
+
+    # Статика и варианты картинок (WebP/AVIF разных ширин, см. app/services/images.py)
+    STATIC_DIR: str = "static"
+    STATIC_BASE_URL: str = "http://localhost:8000"  # как в image_url из seed.py
+    IMAGE_VARIANTS: bool = True
+    IMAGE_VARIANTS_DIR: str = "static/variants"
+    IMAGE_VARIANTS_URL: str = "/static/variants"
+    IMAGE_WORKERS: int = 0  # процессов для ресайза; 0 - по числу ядер
+
+    # Логи и метрики: отладочные события поиска пишутся для доли запросов
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 0.01
+    METRICS_ENABLED: bool = True
     
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
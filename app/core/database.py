@@ -1,13 +1,161 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+import itertools
+import time
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from sqlalchemy.orm import DeclarativeBase, Session
 from app.core.config import settings
+from app.core.metrics import stage_seconds
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # кэш SQLAlchemy-диалекта и собственный кэш asyncpg
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+    if settings.METRICS_ENABLED:
+        _instrument(engine)
+    return engine
+
+
+def _instrument(engine: AsyncEngine):
+    # время каждого SQL-запроса (включая ожидание ответа от Postgres) - стадия "db"
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        # время держим на контексте выполнения: упавший запрос просто его выбросит
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started", None)
+        if started is not None:
+            stage_seconds.observe("db", time.perf_counter() - started)
+
+
+class TimedSession(Session):
+    """Соединение берется лениво, на первом запросе; его ожидание - стадия "db_checkout".
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    Ручка, которой база не понадобилась (пользователь из кэша), соединение не берет вовсе.
+    """
+
+
+if settings.METRICS_ENABLED:
+    @event.listens_for(TimedSession, "do_orm_execute")
+    def _first_statement(orm_execute_state):
+        session = orm_execute_state.session
+        if not session.in_transaction():
+            session.info["checkout_started"] = time.perf_counter()
+
+    @event.listens_for(TimedSession, "after_begin")
+    def _connection_taken(session, transaction, connection):
+        started = session.info.pop("checkout_started", None)
+        if started is not None:
+            stage_seconds.observe("db_checkout", time.perf_counter() - started)
+
+
+engine = _create_engine(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=TimedSession)
 
 class Base(DeclarativeBase):
     pass
 
+async def _checkout(session: AsyncSession):
+    # соединение с реплики берем сразу: ошибка подключения - повод перейти к следующей
+    if settings.METRICS_ENABLED:
+        with stage_seconds.time("db_checkout"):
+            await session.connection()
+    else:
+        await session.connection()
+
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+# время последней записи клиента (read-your-writes): ответ на запись его отдает,
+# клиент присылает обратно - так любой воркер знает, что читать надо с primary
+LAST_WRITE_HEADER = "X-Last-Write"
+
+
+class ReadRouter:
+    """Сессии только для чтения: реплики по кругу, при ошибке - следующая, в конце primary.
+
+    Упавшая реплика выключается на REPLICA_RETRY_SECONDS, чтобы каждый запрос
+    не ждал таймаут соединения. Липкость (read-your-writes) носит с собой
+    клиент в заголовке X-Last-Write, поэтому она одна и та же во всех воркерах.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.replicas = [
+            async_sessionmaker(_create_engine(url), expire_on_commit=False, sync_session_class=TimedSession)
+            for url in urls
+        ]
+        self._next = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._down_until: dict[int, float] = {}
+
+    def candidates(self) -> list[async_sessionmaker]:
+        """Живые реплики, начиная со следующей по кругу"""
+        if not self.replicas:
+            return []
+        now = time.monotonic()
+        start = next(self._next)
+        order = [(start + i) % len(self.replicas) for i in range(len(self.replicas))]
+        return [self.replicas[i] for i in order if self._down_until.get(i, 0) <= now]
+
+    def mark_down(self, factory: async_sessionmaker):
+        if factory in self.replicas:
+            self._down_until[self.replicas.index(factory)] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+    def mark_write(self, response: Response):
+        # время стенное, а не monotonic: сравнивать его будет другой воркер
+        response.headers[LAST_WRITE_HEADER] = f"{time.time():.3f}"
+
+    def is_sticky(self, request: Request) -> bool:
+        """Клиент писал меньше READ_YOUR_WRITES_SECONDS назад - реплика может еще не видеть записи"""
+        try:
+            written_at = float(request.headers.get(LAST_WRITE_HEADER, ""))
+        except ValueError:
+            return False
+        return written_at + settings.READ_YOUR_WRITES_SECONDS > time.time()
+
+    def healthy_replicas(self) -> int:
+        now = time.monotonic()
+        return sum(1 for i in range(len(self.replicas)) if self._down_until.get(i, 0) <= now)
+
+    async def session(self, sticky: bool = False) -> AsyncSession:
+        """Сессия реплики - с уже взятым соединением: ошибка подключения всплывет тут, а не в запросе"""
+        for factory in [] if sticky else self.candidates():
+            session = factory()
+            try:
+                await _checkout(session)
+                return session
+            except (OSError, SQLAlchemyError):
+                await session.close()
+                self.mark_down(factory)
+
+        # primary - последний вариант, переходить дальше некуда: соединение возьмет первый запрос
+        return AsyncSessionLocal()
+
+
+read_router = ReadRouter([url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()])
+
+async def get_read_db():
+    """Для ручек, которые только читают (поиск, фильтры)"""
+    session = await read_router.session()
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -0,0 +1,27 @@
+import json
+import logging
+import random
+
+from app.core.config import settings
+
+
+def setup_logging():
+    # uvicorn настраивает только свои логгеры, нашим "app.*" нужен корневой обработчик
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+
+def sampled(logger: logging.Logger, rate: float | None = None) -> bool:
+    """Писать ли отладку по этому запросу: DEBUG включен и выпал сэмпл.
+
+    Проверяем до сборки полей, чтобы выключенный лог ничего не стоил.
+    """
+    rate = settings.LOG_SAMPLE_RATE if rate is None else rate
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < rate
+
+
+def log_event(logger: logging.Logger, event: str, **fields):
+    # одна строка JSON на событие - удобно грепать и грузить в агрегатор
+    logger.debug(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
@@ -0,0 +1,79 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# секунды: от долей миллисекунды (кэш, auth) до секунд (холодная модель)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с одной меткой (stage, endpoint).
+
+    observe() - бинпоиск по границам и пара инкрементов под локом,
+    так что ее можно дергать на горячем пути и из потоков executor.
+    """
+
+    def __init__(self, name: str, help: str, label: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # значение метки -> [счетчики по корзинам (+Inf последней), сумма, количество]
+        self._series: dict[str, list] = {}
+
+    def observe(self, value: str, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(value)
+            if series is None:
+                series = self._series[value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, value: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(value, time.perf_counter() - started)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {value: (list(counts), total, count) for value, (counts, total, count) in self._series.items()}
+
+        for value, (counts, total, count) in sorted(snapshot.items()):
+            label = f'{self.label}="{value}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+def render_gauges(gauges: dict[str, tuple[str, float]]) -> list[str]:
+    """name -> (help, value) в текстовый формат Prometheus"""
+    lines = []
+    for name, (help, value) in gauges.items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {float(value)}"]
+    return lines
+
+
+def render_counter(name: str, help: str, label: str, values: dict[str, float]) -> list[str]:
+    """Счетчик с одной меткой: {значение метки: сколько}"""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+    for key, value in values.items():
+        lines.append(f'{name}{{{label}="{key}"}} {float(value)}')
+    return lines
+
+
+# стадии запроса: auth, embed_queue_wait, inference, embed_server, db, db_checkout, serialize
+stage_seconds = Histogram("tourguide_stage_seconds", "Время стадий обработки запроса", "stage")
+request_seconds = Histogram("tourguide_request_seconds", "Полное время HTTP-запроса", "endpoint")
@@ -1,14 +1,72 @@
+import asyncio
+import logging
+import math
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from pathlib import Path
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from sqlalchemy import text
 from fastapi.staticfiles import StaticFiles 
 
 from app.api.auth import router as auth_router
 from app.api.users import router as users_router
-from app.core.database import engine, Base
+from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
+from app.core.config import settings
+from app.core.log import setup_logging
+from app.core.database import engine, Base, AsyncSessionLocal, LAST_WRITE_HEADER
+from app.core.metrics import request_seconds
 from app.api.places import router as places_router
 from app.models.place import Place 
+from app.services.vector_index import vector_index
+from app.services.suggest import suggest_index
+from app.services.admission import Overloaded
+from app.services.embedding_client import EmbeddingServerUnavailable
+from app.services.ml_service import load_model_in_background
+from app.services.images import image_processor
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+async def _load_vector_index():
+    try:
+        async with AsyncSessionLocal() as db:
+            await vector_index.load(db)
+        logger.info("Векторный индекс в памяти: %d мест", len(vector_index))
+    except Exception as e:
+        # поиск откатится на pgvector, см. search_places
+        logger.error("Не удалось загрузить векторный индекс: %s", e)
+        return
+
+    # подтягиваем места, добавленные другими воркерами
+    while True:
+        await asyncio.sleep(settings.VECTOR_INDEX_REFRESH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await vector_index.refresh(db)
+        except Exception as e:
+            logger.warning("Не удалось обновить векторный индекс: %s", e)
+
+async def _load_suggest_index():
+    try:
+        async with AsyncSessionLocal() as db:
+            await suggest_index.load(db)
+        logger.info("Индекс автодополнения: %d мест", len(suggest_index))
+    except Exception as e:
+        # /places/suggest ответит через pg_trgm в БД
+        logger.error("Не удалось загрузить индекс автодополнения: %s", e)
+        return
+
+    # изменения каталога из других воркеров и импорта
+    while True:
+        await asyncio.sleep(settings.SUGGEST_REFRESH_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await suggest_index.refresh(db)
+        except Exception as e:
+            logger.warning("Не удалось обновить индекс автодополнения: %s", e)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -19,11 +77,34 @@ async def lifespan(app: FastAPI):
         # эта не нужна с миграцией
         # await conn.run_sync(Base.metadata.create_all)
         
-    print("База данных готова и векторы включены!")
+    logger.info("База данных готова и векторы включены!")
+
+    # тяжелое (модель, векторный индекс) - в фоне: auth/users/фильтры отвечают сразу,
+    # а готовность поиска видна на /health/ready
+    background = [asyncio.create_task(load_model_in_background()), asyncio.create_task(_load_suggest_index())]
+    if settings.SEARCH_BACKEND == "numpy":
+        background.append(asyncio.create_task(_load_vector_index()))
+
     yield
 
-app = FastAPI(title="VKR TourGuide API")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+    for task in background:
+        task.cancel()
+    image_processor.shutdown()
+
+class ImmutableStaticFiles(StaticFiles):
+    """Варианты картинок названы по хэшу содержимого - файл по URL никогда не меняется"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        # ETag/Last-Modified ставит сам StaticFiles, 304 тоже обрабатывает он
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+app = FastAPI(title="VKR TourGuide API", lifespan=lifespan)
+# до /static: маунты матчатся по порядку
+Path(settings.IMAGE_VARIANTS_DIR).mkdir(parents=True, exist_ok=True)
+app.mount(settings.IMAGE_VARIANTS_URL, ImmutableStaticFiles(directory=settings.IMAGE_VARIANTS_DIR), name="image_variants")
+app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 #все разрешено, ничего не запрещено
 app.add_middleware(
     CORSMiddleware,
@@ -31,11 +112,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    # фронт читает и возвращает время своей записи (read-your-writes, app/core/database.py)
+    expose_headers=[LAST_WRITE_HEADER],
 )
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    # быстрый отказ вместо ответа после дедлайна; Retry-After - оценка ожидания в очереди
+    return JSONResponse(
+        {"detail": "Сервер перегружен, повторите позже"},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+@app.exception_handler(EmbeddingServerUnavailable)
+async def embedding_server_unavailable(request: Request, exc: EmbeddingServerUnavailable):
+    # короткий сбой или перезапуск сервера эмбеддингов: клиент повторит, своя модель не грузится
+    return JSONResponse(
+        {"detail": "Сервис эмбеддингов временно недоступен"},
+        status_code=503,
+        headers={"Retry-After": str(max(1, math.ceil(settings.EMBEDDING_SERVER_RETRY_SECONDS)))},
+    )
+
 #Руты
 app.include_router(auth_router, prefix="/api/auth", tags=["Auth"])
 app.include_router(users_router, prefix="/api/users", tags=["Users"])
 app.include_router(places_router, prefix="/places", tags=["Places"])
+app.include_router(health_router, prefix="/health", tags=["Health"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router)
+
+    @app.middleware("http")
+    async def observe_request(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        # имя ручки, а не путь: /favorites/1, /favorites/2... раздули бы метки
+        route = request.scope.get("route")
+        request_seconds.observe(route.name if route else "unmatched", time.perf_counter() - started)
+        return response
 
 @app.get("/")
 async def root():
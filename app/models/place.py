@@ -1,12 +1,77 @@
-from sqlalchemy import String, Integer, Text, Float
+from datetime import datetime
+
+from sqlalchemy import String, Integer, BigInteger, DateTime, Text, Float, Index, Computed, ForeignKey, Table, Column, func, text, cast, select, literal_column, table
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from app.core.config import settings
 from app.core.database import Base
 from sqlalchemy.orm import relationship
 
 
+# Полнотекстовый документ места (см. app/services/text_search.py)
+SEARCH_TSV_EXPRESSION = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(search_context, '')), 'C')"
+)
+
+
+# Курсор синхронизации (/places/export, индексы в памяти): строки с change_xid >= xmin
+# снимка. Транзакции с id меньше xmin уже завершены, поэтому закоммиченное позже
+# курсора не может оказаться меньше него. Строки недавних транзакций могут прийти
+# повторно - применять их идемпотентно
+SYNC_WATERMARK = cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), Text), BigInteger)
+# эпоха каталога: растет на каждый TRUNCATE places (миграция f4c2a8e6b1d3) -
+# id переиспользуются, курсоры прошлой эпохи недействительны
+CATALOG_EPOCH = select(literal_column("last_value")).select_from(table("places_epoch_seq")).scalar_subquery()
+
+
 class Place(Base):
     __tablename__ = "places"
+    __table_args__ = (
+        # ANN-индекс для /search/ai: тот же, что строит миграция 188a97e919a0 по VECTOR_INDEX
+        Index(
+            "ix_places_embedding_ivfflat",
+            "embedding",
+            postgresql_using="ivfflat",
+            postgresql_with={"lists": settings.IVFFLAT_LISTS},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        )
+        if settings.VECTOR_INDEX == "ivfflat"
+        else Index(
+            "ix_places_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        # сжатые копии для VECTOR_PRECISION=halfvec/binary (миграция 6d2c8e4f1a93)
+        Index(
+            "ix_places_embedding_half_hnsw",
+            "embedding_half",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_half": "halfvec_cosine_ops"},
+        ),
+        Index(
+            "ix_places_embedding_bits_hnsw",
+            "embedding_bits",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding_bits": "bit_hamming_ops"},
+        ),
+        # гео-индекс для /search/nearby (cube + earthdistance, см. app/services/geo.py)
+        Index("ix_places_earth", func.ll_to_earth(text("lat"), text("lon")), postgresql_using="gist"),
+        Index("ix_places_search_tsv", "search_tsv", postgresql_using="gin"),
+        # ILIKE '%...%' и опечатки по названию для /places/suggest (pg_trgm, миграция c7e4a1f93b58)
+        Index("ix_places_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        # дельта-синхронизация города (/places/export) - change_xid >= :since
+        Index("ix_places_city_change_xid", "city", "change_xid"),
+        # догоняющие обновления индексов в памяти: то же по всему каталогу
+        Index("ix_places_change_xid", "change_xid"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String, index=True)
@@ -17,6 +82,8 @@ class Place(Base):
     lon: Mapped[float] = mapped_column(Float, nullable=True)
 
     image_url: Mapped[str] = mapped_column(String, nullable=True)
+    # {"avif": "url 320w, url 640w, ...", "webp": ...} - варианты image_url, см. app/services/images.py
+    image_srcset: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
 
     price: Mapped[str] = mapped_column(String, nullable=True) 
 
@@ -24,9 +91,79 @@ class Place(Base):
     description: Mapped[str] = mapped_column(Text) 
     search_context: Mapped[str | None] = mapped_column(Text, nullable=True)
 
-    embedding: Mapped[list[float]] = mapped_column(Vector(768))
+    # ключ для upsert при импорте и хэш текста, из которого посчитан embedding
+    external_id: Mapped[str | None] = mapped_column(String, unique=True, nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    # версия строки: растет из places_version_seq при каждом видимом клиенту
+    # изменении (триггер places_bump_version, миграция a51d6c0e8b27)
+    version: Mapped[int] = mapped_column(BigInteger, server_default=text("nextval('places_version_seq')"))
+    # id транзакции, записавшей это изменение (тот же триггер): по нему - курсор
+    # синхронизации, см. SYNC_WATERMARK
+    change_xid: Mapped[int] = mapped_column(BigInteger, server_default=text("pg_current_xact_id()::text::bigint"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    # мягкое удаление: строка остается надгробием для клиентов с офлайн-копией
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    # ~3 КБ на строку и в ответы не уходит: по умолчанию не грузим, а случайное
+    # обращение падает вместо тихого lazy-load. Где нужен - undefer(Place.embedding)
+    # или явная колонка в select
+    embedding: Mapped[list[float]] = mapped_column(Vector(768), deferred=True, deferred_raiseload=True)
+    # float16 и 1 бит на измерение - считаются из embedding, пишется только он
+    embedding_half = mapped_column(HALFVEC(768), Computed("embedding::halfvec(768)", persisted=True), deferred=True, deferred_raiseload=True)
+    embedding_bits = mapped_column(BIT(768), Computed("binary_quantize(embedding)::bit(768)", persisted=True), deferred=True, deferred_raiseload=True)
+
+    # считается самим Postgres, в SELECT по умолчанию не тащим
+    search_tsv = mapped_column(TSVECTOR, Computed(SEARCH_TSV_EXPRESSION, persisted=True), deferred=True)
 
     favorited_by = relationship("User", secondary="favorites", back_populates="favorites")
 
     def __repr__(self):
-        return f"<Place {self.name} ({self.city})>"
\ No newline at end of file
+        return f"<Place {self.name} ({self.city})>"
+
+
+# "Похожие места": top-N соседей каждого места по косинусу (app/services/neighbors.py)
+place_neighbors_table = Table(
+    "place_neighbors",
+    Base.metadata,
+    Column("place_id", Integer, ForeignKey("places.id", ondelete="CASCADE"), primary_key=True),
+    Column("neighbor_id", Integer, ForeignKey("places.id", ondelete="CASCADE"), primary_key=True),
+    Column("distance", Float, nullable=False),
+    # /places/{id}/similar - один проход по индексу в порядке расстояния
+    Index("ix_place_neighbors_place_distance", "place_id", "distance"),
+    # списки, где место стоит соседом (пересчет после изменения места)
+    Index("ix_place_neighbors_neighbor", "neighbor_id"),
+)
+
+
+# Прежний город места, переехавшего в другой (триггер places_bump_version, миграция
+# a8d3f6c2e9b4): по нему дельта /places/export удаляет место из старого города
+place_moves_table = Table(
+    "place_moves",
+    Base.metadata,
+    Column("place_id", Integer, ForeignKey("places.id", ondelete="CASCADE"), primary_key=True),
+    Column("city", String, nullable=False),
+    Column("version", BigInteger, primary_key=True),
+    Column("change_xid", BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint")),
+    Index("ix_place_moves_city_change_xid", "city", "change_xid"),
+)
+
+
+# Легкое чтение: только колонки PlaceResponse, строки вместо ORM-объектов.
+# select(*PLACE_RESPONSE_COLUMNS) отдает Row, который PlaceResponse валидирует так же, как Place
+PLACE_RESPONSE_COLUMNS = (
+    Place.id,
+    Place.name,
+    Place.city,
+    Place.type,
+    Place.price,
+    Place.description,
+    Place.search_context,
+    Place.image_url,
+    Place.image_srcset,
+    Place.lat,
+    Place.lon,
+)
+
+# удаленные места (надгробия) видны только в /places/export, во всех остальных чтениях - этот фильтр
+PLACE_IS_LIVE = Place.deleted_at.is_(None)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import String, Integer, ForeignKey, Table, Column
+from sqlalchemy import String, Integer, ForeignKey, Table, Column, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from pgvector.sqlalchemy import Vector
 from app.core.database import Base
 
 # Таблица связи (избранное)
@@ -8,6 +9,21 @@ favorites_table = Table(
     Base.metadata,
     Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
     Column("place_id", Integer, ForeignKey("places.id"), primary_key=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    # keyset-пагинация /me/favorites
+    Index("ix_favorites_user_created", "user_id", "created_at", "place_id"),
+)
+
+# Вкус пользователя для /me/recommendations: сумма эмбеддингов избранного и их число.
+# Храним сумму, а не среднее: добавление/удаление избранного - одно сложение/вычитание
+# (app/services/recommendations.py), а для косинуса длина вектора не важна
+user_tastes_table = Table(
+    "user_tastes",
+    Base.metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("embedding_sum", Vector(768), nullable=True),
+    Column("favorites_count", Integer, server_default="0", nullable=False),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False),
 )
 
 class User(Base):
@@ -17,6 +33,8 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String)
     username: Mapped[str] = mapped_column(String, default="username", nullable=False)
+    # растет при смене пароля, старые токены (claim "ver") перестают работать
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
     favorites = relationship("Place", secondary=favorites_table, back_populates="favorited_by")
 
     def __repr__(self):
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Literal, Optional
 
 # --- Базовые схемы ---
 
@@ -9,6 +9,10 @@ class PlaceCreate(BaseModel):
     type: str
     price: str  
     description: str
+    search_context: str | None = None  # текст для эмбеддинга; по умолчанию - описание
+    image_url: str | None = None
+    lat: float | None = Field(None, ge=-90, le=90)
+    lon: float | None = Field(None, ge=-180, le=180)
 
 class PlaceResponse(BaseModel):
     id: int
@@ -19,6 +23,8 @@ class PlaceResponse(BaseModel):
     description: str
     search_context: str | None = None
     image_url: str | None = None
+    # srcset по форматам для <picture>: {"avif": "... 320w, ... 640w", "webp": ...}
+    image_srcset: dict[str, str] | None = None
     lat: float | None = None  
     lon: float | None = None  
 
@@ -27,13 +33,45 @@ class PlaceResponse(BaseModel):
 
 # --- Схемы для поиска ---
 
+class SuggestResponse(BaseModel):
+    id: int
+    name: str
+    city: str
+
 class SearchRequest(BaseModel):
     query: str              
     city: str | None = None 
-    limit: int = 2       
+    limit: int = Field(2, ge=1, le=100)
+    quality: Literal["fast", "balanced", "accurate"] | None = None  # None - из настроек
+    mode: Literal["vector", "hybrid"] | None = None  # None - из настроек (SEARCH_MODE)
+    precision: Literal["full", "halfvec", "binary"] | None = None  # None - из настроек (VECTOR_PRECISION)
+    # опционально: искать только рядом с точкой (ранжирование смешивает смысл и расстояние)
+    lat: float | None = Field(None, ge=-90, le=90)
+    lon: float | None = Field(None, ge=-180, le=180)
+    radius_m: float = Field(2000, gt=0, le=100_000)
+
+    @model_validator(mode="after")
+    def check_point(self):
+        # одна координата без другой - не точка, молча искать без гео нельзя
+        if (self.lat is None) != (self.lon is None):
+            raise ValueError("lat и lon передаются вместе")
+        return self
+
+class NearbyRequest(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lon: float = Field(ge=-180, le=180)
+    radius_m: float = Field(1000, gt=0, le=100_000)
+    query: str | None = None  # "кофе рядом"; без запроса - просто ближайшие
+    city: str | None = None
+    type: str | None = None
+    limit: int = Field(10, ge=1, le=100)
+    distance_weight: float | None = Field(None, ge=0, le=1)  # None - из настроек
+
+class NearbyPlaceResponse(PlaceResponse):
+    distance_m: float
 
 class FilterRequest(BaseModel):
     city: str
     type: str | None = None
     price: str | None = None
-    limit: int = 2  
\ No newline at end of file
+    limit: int = Field(2, ge=1, le=100)  
\ No newline at end of file
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
+from app.schemas.place import PlaceResponse
+
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     old_password: Optional[str] = None
@@ -12,4 +14,16 @@ class UserResponse(BaseModel):
     username: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class UserUpdateResponse(UserResponse):
+    # новый токен, если меняли пароль (старые после этого не принимаются)
+    access_token: str | None = None
+
+class FavoritesPage(BaseModel):
+    items: list[PlaceResponse]
+    next_cursor: str | None = None  # None - это последняя страница
+
+class FavoritesBulkRequest(BaseModel):
+    add: list[int] = Field(default_factory=list, max_length=1000)
+    remove: list[int] = Field(default_factory=list, max_length=1000)
\ No newline at end of file
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+
+from app.core.config import settings
+
+# меньше - важнее: интерактивный поиск обслуживается раньше импорта
+PRIORITIES = {"interactive": 0, "background": 1}
+
+
+class Overloaded(RuntimeError):
+    """ML-путь перегружен: запрос не успеет к своему дедлайну (в API - 503 + Retry-After)"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"перегрузка, повторить через {retry_after:.1f} с")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Вход в ML-путь: не больше capacity вычислений сразу, остальные - в очереди с приоритетами.
+
+    Ожидание в очереди оценивается по закону Литтла: сумма средних времен слота
+    впереди стоящих и самого запроса / capacity. Среднее считается по классу:
+    чанк импорта держит слот на порядки дольше одного поискового запроса. Если оценка больше дедлайна класса или очередь полна, запрос
+    сразу получает Overloaded - лучше быстрый 503, чем ответ, которого клиент
+    уже не дождется. Дождавшийся дедлайна в очереди тоже отклоняется.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, deadlines: dict[str, float]):
+        self.capacity = capacity  # 0 - без ограничений
+        self.max_queue = max_queue
+        self.deadlines = deadlines
+
+        self.active = 0
+        self.waiting = 0
+        # куча (приоритет, порядковый номер, future); отмененные выкидываются лениво в release
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        # скользящее среднее времени, которое запрос держит слот, по классам
+        self.slot_seconds = {priority: 0.05 for priority in PRIORITIES}
+        self._priority_names = {rank: priority for priority, rank in PRIORITIES.items()}
+
+        # статистика
+        self.admitted = 0
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        # seed.py и ingest.py поднимают свой цикл через asyncio.run
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = []
+            self.active = self.waiting = 0
+
+    def projected_wait(self, priority: str) -> float:
+        """Оценка ожидания: впереди - ожидающие того же или более важного класса"""
+        rank = PRIORITIES[priority]
+        busy = self.slot_seconds[priority]
+        for other, _, future in self._waiters:
+            if other <= rank and not future.done():
+                busy += self.slot_seconds[self._priority_names[other]]
+        return busy / self.capacity
+
+    def _reject(self, priority: str, wait: float):
+        self.rejected[priority] += 1
+        raise Overloaded(wait)
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive"):
+        if self.capacity <= 0:
+            yield
+            return
+
+        await self.acquire(priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.slot_seconds[priority] = 0.9 * self.slot_seconds[priority] + 0.1 * elapsed
+            self.release()
+
+    async def acquire(self, priority: str):
+        self._ensure_loop()
+        if self.active < self.capacity and not self.waiting:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        rank = PRIORITIES[priority]
+        deadline = self.deadlines[priority]
+        projected = self.projected_wait(priority)
+        if self.waiting >= self.max_queue or projected > deadline:
+            self._reject(priority, projected)
+
+        future = self._loop.create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), future))
+        self.waiting += 1
+        try:
+            async with asyncio.timeout(deadline):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # слот уже передали, а запрос ушел (дедлайн или клиент отвалился) - отдаем дальше
+                self.release()
+            if isinstance(e, TimeoutError):
+                self._reject(priority, self.projected_wait(priority))
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # слот переходит следующему напрямую, active не меняется
+                future.set_result(None)
+                self.admitted += 1
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "slot_ms": {priority: seconds * 1000 for priority, seconds in self.slot_seconds.items()},
+        }
+
+
+admission = AdmissionController(
+    settings.ADMISSION_CONCURRENCY,
+    settings.ADMISSION_MAX_QUEUE,
+    {
+        "interactive": settings.ADMISSION_INTERACTIVE_DEADLINE,
+        "background": settings.ADMISSION_BACKGROUND_DEADLINE,
+    },
+)
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable
+
+
+class EmbeddingBatcher:
+    """Склеивает конкурентные вызовы embed() в один батч для encode_fn.
+
+    Батч отправляется, как только набралось max_batch_size текстов
+    или с момента первого запроса прошло max_wait_ms.
+    Каждый вызывающий получает свой future со своим вектором.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], list[list[float]]],
+        executor: Executor,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrent_batches: int = 1,
+        on_queue_wait: Callable[[float], None] | None = None,
+    ):
+        self.encode_fn = encode_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        # внешний учет ожидания в очереди (гистограмма метрик), секунды на каждый текст
+        self.on_queue_wait = on_queue_wait
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+        # статистика
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        # seed.py и тесты поднимают свой event loop через asyncio.run,
+        # поэтому очередь и воркер привязываем к текущему циклу
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> list[float]:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((text, future, time.perf_counter()))
+        return await future
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _collect(self) -> list[tuple]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # сначала забираем всё, что уже лежит в очереди, без ожидания
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            # пока батч считается в executor, продолжаем собирать следующий
+            self._loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: list[tuple]):
+        try:
+            started = time.perf_counter()
+            self._record(batch, started)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                vectors = await self._loop.run_in_executor(self.executor, self.encode_fn, texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), vector in zip(batch, vectors):
+                # клиент мог отвалиться (отмена запроса), тогда просто пропускаем
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self._slots.release()
+
+    def _record(self, batch: list[tuple], started: float):
+        self.batches += 1
+        self.items += len(batch)
+        self.max_seen_batch = max(self.max_seen_batch, len(batch))
+        for _, _, enqueued in batch:
+            wait = started - enqueued
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+            if self.on_queue_wait is not None:
+                self.on_queue_wait(wait)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_seen_batch,
+            "avg_queue_wait_ms": self.queue_wait_total / self.items * 1000 if self.items else 0.0,
+            "max_queue_wait_ms": self.queue_wait_max * 1000,
+            "queue_depth": self.queue_depth(),
+        }
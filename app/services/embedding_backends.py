@@ -0,0 +1,118 @@
+import hashlib
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+# paraphrase-multilingual-mpnet-base-v2 обучалась с max_seq_length=128
+MAX_SEQ_LENGTH = 128
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+
+
+class TorchBackend:
+    """Эталон: SentenceTransformer на PyTorch в полной точности"""
+
+    name = "torch"
+
+    def __init__(self, model_name: str, local_files_only: bool = True):
+        # импорт тут, чтобы onnx-бэкенд вообще не тянул torch в процесс
+        from sentence_transformers import SentenceTransformer
+
+        try:
+            # сначала только локальный кэш HF: старт не должен зависеть от хаба
+            self.model = SentenceTransformer(model_name, local_files_only=local_files_only)
+        except (OSError, ValueError):
+            if not local_files_only:
+                raise
+            # модели еще нет в кэше (первый запуск) - качаем
+            self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        return self.model.encode(texts, batch_size=min(len(texts), 64), normalize_embeddings=True).tolist()
+
+
+class OnnxBackend:
+    """ONNX Runtime + int8-квантованный экспорт той же модели (см. export_onnx.py).
+
+    Пулинг и нормализация повторяют SentenceTransformer: mean pooling по маске + L2.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, threads: int = 0):
+        self.name = "onnx" if quantized else "onnx-fp32"
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "Для EMBEDDING_BACKEND=onnx нужен onnxruntime: uv sync --extra onnx"
+            ) from e
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / (ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        if not model_path.exists():
+            raise RuntimeError(f"Нет {model_path}, сначала запусти: python export_onnx.py")
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("<pad>") or 1, pad_token="<pad>")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, inputs)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+
+class FakeBackend:
+    """Детерминированная замена модели для бенчмарков и офлайн-разработки.
+
+    Вектор текста - нормированная сумма псевдослучайных векторов его слов
+    (генератор засеян хэшем слова), так что тексты с общими словами близки.
+    """
+
+    name = "fake"
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+
+    @lru_cache(maxsize=100_000)
+    def _word_vector(self, word: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha1(word.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[i] += self._word_vector(word)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.tolist()
+
+
+def create_backend(name: str, model_name: str, onnx_dir: str, threads: int = 0, local_files_only: bool = True):
+    if name == "onnx":
+        return OnnxBackend(onnx_dir, quantized=True, threads=threads)
+    if name == "onnx-fp32":
+        return OnnxBackend(onnx_dir, quantized=False, threads=threads)
+    if name == "fake":
+        return FakeBackend()
+    return TorchBackend(model_name, local_files_only=local_files_only)
@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+
+def normalize_text(text: str) -> str:
+    """Приводим запрос к каноническому виду: «Кофе  » и «Кофе» - один ключ.
+
+    Это же уходит в модель, поэтому только то, что токенизатор и сам не различает
+    (NFKC и лишние пробелы). Регистр не трогаем: токенизатор модели регистрозависимый,
+    "Кофе" и "кофе" дают разные векторы.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def cache_key(text: str, model_name: str) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Простой LRU в памяти процесса с ограничением по размеру и TTL"""
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if self.ttl and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteVectorStore:
+    """Персистентный слой: float32-блобы в SQLite.
+
+    Переживает рестарт и шарится между воркерами одного хоста (WAL).
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = array("f")
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put(self, key: str, value: list[float]):
+        blob = array("f", value).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", (key, blob)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """Двухуровневый кэш эмбеддингов: LRU в памяти + опционально SQLite на диске"""
+
+    def __init__(self, model_name: str, max_size: int = 10_000, ttl: float = 0, path: str | None = None):
+        self.model_name = model_name
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteVectorStore(path) if path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        return cache_key(normalize_text(text), self.model_name)
+
+    async def get(self, text: str) -> list[float] | None:
+        key = self.key(text)
+
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory_hits += 1
+            return vector
+
+        if self.disk is not None:
+            # sqlite блокирующий, уносим из event loop
+            vector = await asyncio.to_thread(self.disk.get, key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.put(key, vector)
+                return vector
+
+        self.misses += 1
+        return None
+
+    async def put(self, text: str, vector: list[float]):
+        key = self.key(text)
+        self.memory.put(key, vector)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, vector)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_size": len(self.memory),
+        }
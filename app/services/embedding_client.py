@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import struct
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Протокол поверх Unix-сокета (см. app/services/embedding_server.py), без JSON:
+#   запрос: число текстов, затем для каждого длина + UTF-8 (0 текстов - пинг)
+#   ответ: статус, строки, размерность и rows * dim float32 little-endian;
+#          при ошибке вместо строк - длина сообщения, dim = 0
+REQUEST_HEADER = struct.Struct("!I")
+TEXT_HEADER = struct.Struct("!I")
+RESPONSE_HEADER = struct.Struct("!BII")
+VECTOR_DTYPE = np.dtype("<f4")
+
+STATUS_OK = 0
+STATUS_NOT_READY = 1
+STATUS_ERROR = 2
+
+
+class EmbeddingServerError(RuntimeError):
+    """Сервер не посчитал векторы (STATUS_ERROR - ошибка encode на его стороне)"""
+
+
+class EmbeddingServerUnavailable(EmbeddingServerError):
+    """Сервер сейчас не отвечает - повторить позже (в API - 503 + Retry-After)"""
+
+
+class EmbeddingServerNotReady(EmbeddingServerUnavailable):
+    """Сервер жив, но модель еще грузится (например, перезапуск)"""
+
+
+def encode_request(texts: list[str]) -> bytes:
+    parts = [REQUEST_HEADER.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts += [TEXT_HEADER.pack(len(data)), data]
+    return b"".join(parts)
+
+
+async def read_request(reader: asyncio.StreamReader) -> list[str]:
+    (count,) = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+    texts = []
+    for _ in range(count):
+        (size,) = TEXT_HEADER.unpack(await reader.readexactly(TEXT_HEADER.size))
+        texts.append((await reader.readexactly(size)).decode("utf-8"))
+    return texts
+
+
+def encode_response(status: int, vectors: list[list[float]] | None = None, message: str = "") -> bytes:
+    if status == STATUS_OK:
+        if vectors:
+            matrix = np.asarray(vectors, dtype=VECTOR_DTYPE).reshape(len(vectors), -1)
+        else:
+            matrix = np.empty((0, 0), dtype=VECTOR_DTYPE)
+        return RESPONSE_HEADER.pack(status, *matrix.shape) + matrix.tobytes()
+    data = message.encode("utf-8")
+    return RESPONSE_HEADER.pack(status, len(data), 0) + data
+
+
+async def read_response(reader: asyncio.StreamReader) -> list[list[float]]:
+    status, rows, dim = RESPONSE_HEADER.unpack(await reader.readexactly(RESPONSE_HEADER.size))
+    if status == STATUS_OK:
+        payload = await reader.readexactly(rows * dim * VECTOR_DTYPE.itemsize)
+        return np.frombuffer(payload, dtype=VECTOR_DTYPE).reshape(rows, dim).tolist()
+
+    message = (await reader.readexactly(rows)).decode("utf-8")
+    if status == STATUS_NOT_READY:
+        raise EmbeddingServerNotReady(message)
+    raise EmbeddingServerError(message)
+
+
+class EmbeddingClient:
+    """Тонкий клиент воркера к серверу эмбеддингов.
+
+    Держит пул соединений (на соединении один запрос за раз), у каждого
+    запроса таймаут. После сбоя соединения сервер retry_seconds считается
+    недоступным; outage_seconds - сколько длится текущий сбой (по нему
+    ml_service решает, не пора ли грузить свою модель).
+    """
+
+    def __init__(self, path: str, pool_size: int, timeout: float, retry_seconds: float):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        # сервер хоть раз ответил, что модель готова (см. wait_ready)
+        self.ready = False
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._down_until = 0.0
+        self._down_since: float | None = None
+
+        # статистика
+        self.requests = 0
+        self.failures = 0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        # seed.py и ingest.py поднимают свой цикл через asyncio.run:
+        # соединения прошлого цикла в новом не работают
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    @property
+    def outage_seconds(self) -> float:
+        """Сколько сервер подряд не отвечает (0 - отвечает)"""
+        return time.monotonic() - self._down_since if self._down_since is not None else 0.0
+
+    def _alive(self):
+        self._down_until = 0.0
+        self._down_since = None
+
+    async def embed(self, texts: list[str], timeout: float | None = None, bulk: bool = False) -> list[list[float]]:
+        """bulk - большой чанк импорта: его таймаут говорит о медленном encode, а не о падении сервера"""
+        if not self.available:
+            raise EmbeddingServerUnavailable("сервер эмбеддингов недоступен")
+        return await self._request(texts, timeout or self.timeout, mark_down_on_timeout=not bulk)
+
+    async def _request(
+        self, texts: list[str], timeout: float, mark_down: bool = True, mark_down_on_timeout: bool = True
+    ) -> list[list[float]]:
+        self._ensure_loop()
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            reusable = False
+            try:
+                async with asyncio.timeout(timeout):
+                    if connection is None:
+                        connection = await asyncio.open_unix_connection(self.path)
+                    reader, writer = connection
+                    writer.write(encode_request(texts))
+                    await writer.drain()
+                    try:
+                        vectors = await read_response(reader)
+                    except EmbeddingServerError:
+                        # ответ дочитан целиком - соединение можно переиспользовать;
+                        # сервер ответил (пусть и NOT_READY/ERROR) - значит, жив
+                        reusable = True
+                        self._alive()
+                        raise
+                reusable = True
+                self.requests += 1
+                self._alive()
+                return vectors
+            except (OSError, EOFError) as e:
+                # TimeoutError тоже OSError: недочитанный ответ остался в сокете
+                if mark_down and (mark_down_on_timeout or not isinstance(e, TimeoutError)):
+                    self.failures += 1
+                    now = time.monotonic()
+                    self._down_until = now + self.retry_seconds
+                    if self._down_since is None:
+                        self._down_since = now
+                    logger.warning("Сервер эмбеддингов %s: %s - %s с не обращаемся", self.path, type(e).__name__, self.retry_seconds)
+                raise EmbeddingServerUnavailable(f"{type(e).__name__}: {e}") from e
+            finally:
+                if connection is not None:
+                    if reusable:
+                        self._idle.append(connection)
+                    else:
+                        connection[1].close()
+
+    async def wait_ready(self, timeout: float, interval: float = 0.5) -> bool:
+        """Пингует сервер, пока тот не ответит, что модель готова (или не выйдет timeout)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                # на старте сервер может еще не слушать сокет - это не сбой
+                await self._request([], self.timeout, mark_down=False)
+                self.ready = True
+                return True
+            except EmbeddingServerError:
+                await asyncio.sleep(interval)
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "available": self.available,
+            "outage_seconds": round(self.outage_seconds, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "idle_connections": len(self._idle),
+        }
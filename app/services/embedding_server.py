@@ -0,0 +1,89 @@
+"""Общий сервер эмбеддингов: одна копия модели на хост для всех воркеров uvicorn.
+
+    EMBEDDING_WORKERS=4 python -m app.services.embedding_server --socket /tmp/tourguide-embed.sock
+    EMBEDDING_SERVER_SOCKET=/tmp/tourguide-embed.sock uvicorn app.main:app --workers 8
+
+Воркеры API шлют сюда тексты по Unix-сокету и получают float32-буферы
+(протокол - app/services/embedding_client.py). Запросы всех воркеров
+склеиваются одним микро-батчером, так что потоки модели (EMBEDDING_WORKERS)
+больше не делятся между процессами. Если сервер недоступен, воркер считает
+в процессе сам (EMBEDDING_SERVER_FALLBACK).
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from app.core.config import settings
+from app.core.log import setup_logging
+from app.services import ml_service
+from app.services.embedding_client import (
+    STATUS_ERROR,
+    STATUS_NOT_READY,
+    STATUS_OK,
+    encode_response,
+    read_request,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def respond(texts: list[str]) -> bytes:
+    # ml_service.backend, а не is_model_ready(): тот в режиме клиента смотрел бы на сам сервер
+    if ml_service.backend is None:
+        return encode_response(STATUS_NOT_READY, message=ml_service.model_error or "модель загружается")
+    if not texts:
+        return encode_response(STATUS_OK, [])  # пинг
+
+    try:
+        # тексты уже нормализованы клиентом; батчер соберет их вместе с запросами других воркеров
+        vectors = await asyncio.gather(*(ml_service.batcher.embed(text) for text in texts))
+    except Exception as e:
+        logger.exception("Ошибка encode")
+        return encode_response(STATUS_ERROR, message=f"{type(e).__name__}: {e}")
+    return encode_response(STATUS_OK, vectors)
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                texts = await read_request(reader)
+            except asyncio.IncompleteReadError:
+                break  # клиент закрыл соединение
+            writer.write(await respond(texts))
+            await writer.drain()
+    except (ConnectionError, UnicodeDecodeError) as e:
+        logger.debug("Соединение закрыто: %s", e)
+    finally:
+        writer.close()
+
+
+async def serve(path: str):
+    # сокет от прошлого запуска остается файлом и мешает bind
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = await asyncio.start_unix_server(handle, path)
+    # сокет слушает сразу: пока модель грузится, клиенты получают STATUS_NOT_READY
+    loading = asyncio.create_task(ml_service.load_local_model())
+    logger.info("Сервер эмбеддингов слушает %s", path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        loading.cancel()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Общий сервер эмбеддингов для воркеров API")
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET or "/tmp/tourguide-embed.sock")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,89 @@
+import json
+from typing import AsyncIterator
+
+from pydantic import TypeAdapter
+from sqlalchemy import select, func, cast, Text, BigInteger
+
+from app.core.database import read_router
+from app.models.place import (
+    Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE, SYNC_WATERMARK, CATALOG_EPOCH, place_moves_table,
+)
+from app.schemas.place import PlaceResponse
+
+place_adapter = TypeAdapter(PlaceResponse)
+
+# xid, которые еще не выдавались: курсор больше этого - не от этой базы
+SYNC_HORIZON = cast(cast(func.pg_snapshot_xmax(func.pg_current_snapshot()), Text), BigInteger)
+
+
+def parse_since(since: str | None) -> tuple[int, int] | None:
+    """Курсор "эпоха.xid" из next_since; без него - полный снимок. ValueError - мусор"""
+    if not since:
+        return None
+    if since.isdigit():
+        # числовая версия от клиентов до f4c2a8e6b1d3 - отдаем полный снимок
+        return None
+    epoch, _, xid = since.partition(".")
+    return int(epoch), int(xid)
+
+
+async def export_lines(city: str, since: tuple[int, int] | None = None, batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """NDJSON города: без since - полный снимок, иначе только изменения после курсора.
+
+    Строки:
+      {"op": "reset"}                                 - полный снимок: локальную копию выбросить
+      {"op": "upsert", "version": N, "place": {...PlaceResponse}}
+      {"op": "delete", "version": N, "id": ID}        - надгробие или переезд в другой город, только в дельте
+      {"op": "end", "next_since": "E.X"}              - с этим since приходить в следующий раз
+
+    Курсор - эпоха каталога и xmin снимка (SYNC_WATERMARK): изменение, закоммиченное
+    после выгрузки, под него не спрячется, а недавние строки могут прийти повторно.
+    Курсор другой эпохи (после TRUNCATE) или из будущего (база восстановлена из бэкапа) -
+    вместо дельты полный снимок.
+
+    Читаем серверным курсором порциями по batch_size: память не зависит от размера города.
+    """
+    # своя сессия: генератор дочитывается уже после выхода из ручки
+    async with await read_router.session() as db:
+        # водяной знак - до чтения строк: со снимком самого чтения он только консервативнее
+        epoch, watermark, horizon = (
+            await db.execute(select(CATALOG_EPOCH, SYNC_WATERMARK, SYNC_HORIZON))
+        ).one()
+        if since is not None and (since[0] != epoch or since[1] > horizon):
+            since = None
+
+        stmt = (
+            select(*PLACE_RESPONSE_COLUMNS, Place.version, Place.deleted_at)
+            .where(Place.city == city)
+            .execution_options(yield_per=batch_size)
+        )
+        if since is None:
+            # в полном снимке удаленные не нужны - у клиента их еще нет
+            stmt = stmt.where(PLACE_IS_LIVE).order_by(Place.id)
+            yield b'{"op":"reset"}\n'
+        else:
+            stmt = stmt.where(Place.change_xid >= since[1]).order_by(Place.change_xid, Place.id)
+            # уехавшие из города - раньше upsert: вернувшееся обратно место восстановит строка places
+            moves = (
+                select(place_moves_table.c.place_id, func.max(place_moves_table.c.version))
+                .where(place_moves_table.c.city == city, place_moves_table.c.change_xid >= since[1])
+                .group_by(place_moves_table.c.place_id)
+            )
+            moved = (await db.execute(moves)).all()
+            if moved:
+                yield b"".join(
+                    b'{"op":"delete","version":%d,"id":%d}\n' % (version, place_id) for place_id, version in moved
+                )
+
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            lines = []
+            for row in rows:
+                if row.deleted_at is not None:
+                    lines.append(b'{"op":"delete","version":%d,"id":%d}\n' % (row.version, row.id))
+                else:
+                    place = place_adapter.dump_json(place_adapter.validate_python(row))
+                    lines.append(b'{"op":"upsert","version":%d,"place":%s}\n' % (row.version, place))
+            yield b"".join(lines)
+
+    yield (json.dumps({"op": "end", "next_since": f"{epoch}.{watermark}"}) + "\n").encode()
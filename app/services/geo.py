@@ -0,0 +1,34 @@
+from sqlalchemy import and_, func
+
+from app.models.place import Place
+
+# Гео-выражения на cube/earthdistance. Точки мест индексируются GiST-индексом
+# ix_places_earth по ll_to_earth(lat, lon), поэтому фильтр по радиусу и
+# сортировка по <-> идут по индексу, без haversine по всей таблице.
+
+
+def earth_point(lat: float, lon: float):
+    # float(), чтобы параметры всегда уходили как double precision
+    return func.ll_to_earth(float(lat), float(lon))
+
+
+def place_point():
+    return func.ll_to_earth(Place.lat, Place.lon)
+
+
+def distance_m(lat: float, lon: float):
+    """Расстояние по поверхности Земли в метрах"""
+    return func.earth_distance(earth_point(lat, lon), place_point())
+
+
+def within_radius(lat: float, lon: float, radius_m: float):
+    # earth_box - грубый куб вокруг точки (по индексу), earth_distance - точная проверка
+    return and_(
+        func.earth_box(earth_point(lat, lon), float(radius_m)).op("@>")(place_point()),
+        distance_m(lat, lon) <= float(radius_m),
+    )
+
+
+def nearest_first(lat: float, lon: float):
+    # kNN по GiST: хордовое расстояние монотонно с расстоянием по поверхности
+    return place_point().op("<->")(earth_point(lat, lon))
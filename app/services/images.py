@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ширины под карточку в списке, избранное и детальный просмотр (с запасом под retina)
+VARIANT_WIDTHS = (320, 640, 1280)
+# в порядке предпочтения для <picture>; avif есть не в каждой сборке Pillow
+VARIANT_FORMATS = ("avif", "webp")
+QUALITY = {"avif": 50, "webp": 75}
+
+
+def source_path(image_url: str | None) -> Path | None:
+    """Локальный файл для image_url вида http://host/static/images/x.jpg или /static/images/x.jpg.
+
+    Внешние картинки не скачиваем - для них остается только image_url.
+    Путь должен остаться внутри STATIC_DIR: "/static/../../etc/x.png" из POST /places
+    иначе опубликовал бы любой читаемый процессом файл через /static/variants.
+    """
+    if not image_url:
+        return None
+    path = urlparse(image_url).path
+    if not path.startswith("/static/"):
+        return None
+    root = Path(settings.STATIC_DIR).resolve()
+    local = (root / path.removeprefix("/static/")).resolve()
+    if not local.is_relative_to(root):
+        logger.warning("image_url вне STATIC_DIR, пропускаем: %s", image_url)
+        return None
+    return local if local.is_file() else None
+
+
+def make_variants(path: str, out_dir: str) -> dict[str, list[tuple[str, int]]]:
+    """Ресайз в WebP/AVIF по VARIANT_WIDTHS. Выполняется в процессе пула.
+
+    Имя файла - хэш исходника + ширина: одинаковые картинки не пересчитываются,
+    а новая версия файла получает новый URL (поэтому кэш может быть immutable).
+    Возвращает {формат: [(имя файла, ширина), ...]}.
+    """
+    from PIL import Image, features
+
+    data = Path(path).read_bytes()
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    variants: dict[str, list[tuple[str, int]]] = {}
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        # не растягиваем: ширины больше оригинала заменяем самим оригиналом
+        widths = sorted({min(width, image.width) for width in VARIANT_WIDTHS})
+
+        for fmt in VARIANT_FORMATS:
+            if not features.check(fmt):
+                continue
+            for width in widths:
+                name = f"{digest}-{width}.{fmt}"
+                target = out / name
+                if not target.exists():
+                    height = round(image.height * width / image.width)
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    # пишем во временный файл: соседний процесс не увидит недописанный
+                    tmp = target.with_suffix(f".{fmt}.{os.getpid()}.tmp")
+                    resized.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                    tmp.replace(target)
+                variants.setdefault(fmt, []).append((name, width))
+    return variants
+
+
+def srcset(variants: dict[str, list[tuple[str, int]]]) -> dict[str, str]:
+    """{формат: "url 320w, url 640w"} - прямо в <source srcset> на фронте"""
+    base = f"{settings.STATIC_BASE_URL}{settings.IMAGE_VARIANTS_URL}"
+    return {
+        fmt: ", ".join(f"{base}/{name} {width}w" for name, width in files)
+        for fmt, files in variants.items()
+    }
+
+
+class ImageProcessor:
+    """Пул процессов для ресайза: декодирование/кодирование упирается в CPU и GIL"""
+
+    def __init__(self, workers: int):
+        self.workers = workers or None  # None - по числу ядер
+        self._pool: ProcessPoolExecutor | None = None
+        self._disabled = False
+
+    def _ensure_pool(self) -> ProcessPoolExecutor | None:
+        if self._pool is None and not self._disabled:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                logger.warning("Pillow не установлен (uv sync --extra images) - варианты картинок не создаются")
+                self._disabled = True
+                return None
+            # spawn, а не fork: в воркере API уже есть потоки (модель, executor)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def srcsets(self, image_urls: list[str | None]) -> list[dict[str, str] | None]:
+        """srcset для каждого image_url (None - внешняя картинка или ошибка)"""
+        if not settings.IMAGE_VARIANTS:
+            return [None] * len(image_urls)
+
+        paths = [source_path(url) for url in image_urls]
+        unique = sorted({str(path) for path in paths if path is not None})
+        pool = self._ensure_pool() if unique else None
+        if pool is None:
+            return [None] * len(image_urls)
+
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, make_variants, path, settings.IMAGE_VARIANTS_DIR) for path in unique),
+            return_exceptions=True,
+        )
+
+        by_path = {}
+        for path, result in zip(unique, results):
+            if isinstance(result, Exception):
+                logger.warning("Не удалось обработать %s: %s", path, result)
+            elif result:
+                by_path[path] = srcset(result)
+        return [by_path.get(str(path)) if path is not None else None for path in paths]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+image_processor = ImageProcessor(settings.IMAGE_WORKERS)
@@ -0,0 +1,274 @@
+import csv
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable
+
+from pydantic import ValidationError
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.place import Place
+from app.schemas.place import PlaceCreate
+from app.services.ml_service import get_embeddings
+from app.services.images import image_processor
+from app.services.neighbors import update_neighbors
+from app.services.recommendations import refresh_tastes_for_places
+
+# Колонки, которые можно передать во входном файле
+PLACE_FIELDS = ("name", "city", "type", "price", "description", "lat", "lon", "image_url", "search_context")
+# плюс то, что считаем сами при импорте; deleted_at=NULL - повторный импорт "воскрешает" место
+STORED_FIELDS = (*PLACE_FIELDS, "image_srcset", "deleted_at")
+# 500 строк x ~15 колонок в одном INSERT; больше 2000 упрется в лимит asyncpg (32767 параметров)
+MAX_CHUNK_SIZE = 2000
+# сколько сообщений о битых строках возвращать в статистике
+MAX_ERRORS = 20
+# в CSV все строки: пустая ячейка необязательного поля = NULL
+OPTIONAL_FIELDS = ("lat", "lon", "image_url", "search_context")
+# длиннее строки входа не бывает (описание + контекст с запасом); без перевода строки
+# тело иначе копилось бы в памяти целиком
+MAX_LINE_BYTES = 1 << 20
+
+
+class LineTooLong(ValueError):
+    """Строка входа длиннее MAX_LINE_BYTES: импорт обрывается, а не пропускает ее"""
+
+
+def content_hash(text: str) -> str:
+    # модель в хэше: после смены модели все векторы пересчитаются
+    return hashlib.sha1(f"{settings.EMBEDDING_MODEL}\0{text}".encode("utf-8")).hexdigest()
+
+
+def place_key(record: dict) -> str:
+    return record.get("external_id") or f"{record['city']}:{record['name']}"
+
+
+def prepare_record(record: dict) -> dict:
+    """Проверяет строку из JSONL/CSV по PlaceCreate и приводит к колонкам places.
+
+    ValueError (в том числе ValidationError) - строка битая, ее пропускаем.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"ожидался объект, получено {type(record).__name__}")
+    record = {name: None if name in OPTIONAL_FIELDS and value == "" else value for name, value in record.items()}
+    row = PlaceCreate.model_validate(record).model_dump(include=set(PLACE_FIELDS))
+    row["search_context"] = row["search_context"] or row["description"]
+    row["external_id"] = place_key(record)
+    row["content_hash"] = content_hash(row["search_context"])
+    return row
+
+
+@dataclass
+class IngestStats:
+    total: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    chunks: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    # для инвалидации кэша поиска: затронутые города (старые и новые) и обновленные места
+    cities: set[str] = field(default_factory=set)
+    updated_ids: list[int] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+    def reject(self, index: int, error: Exception):
+        """Битая строка: считаем и пропускаем, первые MAX_ERRORS - с причиной"""
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS:
+            if isinstance(error, ValidationError):
+                reason = "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+            else:
+                reason = str(error)
+            self.errors.append(f"строка {index + 1}: {reason}")
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.total / elapsed if elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "embedded": self.embedded,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "chunks": self.chunks,
+            "rows_per_sec": round(self.rate, 1),
+            "errors": self.errors,
+        }
+
+
+# --- чтение входа: всегда построчно, память не зависит от размера файла ---
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Режет поток байт (тело запроса) на строки; LineTooLong - строка длиннее MAX_LINE_BYTES"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            raise LineTooLong(f"строка длиннее {MAX_LINE_BYTES} байт")
+        for line in lines:
+            if len(line) > MAX_LINE_BYTES:
+                raise LineTooLong(f"строка длиннее {MAX_LINE_BYTES} байт")
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+async def aiter_sync(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line
+
+
+async def iter_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[dict | ValueError]:
+    """JSONL или CSV с заголовком. В CSV переносы строк внутри ячеек не поддерживаются.
+
+    Нечитаемая строка отдается как ValueError на ее месте: импорт не обрывается,
+    а ingest_chunk посчитает ее битой.
+    """
+    header = None
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if fmt == "jsonl":
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield ValueError(f"не JSON: {e}")
+        elif header is None:
+            header = next(csv.reader([line]))
+        else:
+            cells = next(csv.reader([line]))
+            if len(cells) != len(header):
+                yield ValueError(f"ячеек {len(cells)}, в заголовке {len(header)}")
+            else:
+                yield dict(zip(header, cells))
+
+
+async def iter_chunks(records: AsyncIterable[dict], size: int) -> AsyncIterator[list[dict]]:
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- запись ---
+
+def _prepare_chunk(records: list[dict | ValueError], stats: IngestStats) -> list[dict]:
+    prepared = []
+    for i, record in enumerate(records, start=stats.total):
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            prepared.append(prepare_record(record))
+        except ValueError as e:
+            stats.reject(i, e)
+    # дубли внутри чанка: побеждает последняя строка (иначе ON CONFLICT упадет)
+    return list({row["external_id"]: row for row in prepared}.values())
+
+
+async def ingest_chunk(db: AsyncSession, records: list[dict | ValueError], stats: IngestStats, neighbors: bool = True):
+    """Upsert одного чанка одним INSERT ... ON CONFLICT"""
+    rows = _prepare_chunk(records, stats)
+    if not rows:
+        stats.total += len(records)
+        stats.chunks += 1
+        return
+
+    # варианты картинок - в пуле процессов; уже готовые файлы (тот же хэш) не пересчитываются
+    for row, srcset in zip(rows, await image_processor.srcsets([row["image_url"] for row in rows])):
+        row["image_srcset"] = srcset
+        row["deleted_at"] = None
+
+    result = await db.execute(
+        select(Place.external_id, Place.content_hash, Place.id, Place.city, Place.deleted_at)
+        .where(Place.external_id.in_([row["external_id"] for row in rows]))
+    )
+    existing = result.all()
+    known = {row.external_id: row.content_hash for row in existing}
+    by_key = {row.external_id: row for row in existing}
+
+    changed = [row for row in rows if known.get(row["external_id"]) != row["content_hash"]]
+    unchanged = [row for row in rows if known.get(row["external_id"]) == row["content_hash"]]
+
+    if changed:
+        vectors = await get_embeddings([row["search_context"] for row in changed])
+        for row, vector in zip(changed, vectors):
+            row["embedding"] = vector
+
+        stmt = pg_insert(Place).values(changed)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Place.external_id],
+            set_={name: stmt.excluded[name] for name in (*STORED_FIELDS, "content_hash", "embedding")},
+        )
+        embedded_ids = list((await db.execute(stmt.returning(Place.id))).scalars())
+    else:
+        embedded_ids = []
+
+    if unchanged:
+        # текст не менялся - вектор не трогаем, обновляем только остальные поля
+        await db.execute(
+            update(Place.__table__)
+            .where(Place.__table__.c.external_id == bindparam("key"))
+            .values({name: bindparam(f"new_{name}") for name in STORED_FIELDS}),
+            [
+                {"key": row["external_id"], **{f"new_{name}": row[name] for name in STORED_FIELDS}}
+                for row in unchanged
+            ],
+        )
+
+    if neighbors:
+        # новый вектор, переезд в другой город или возврат удаленного - меняются "похожие места"
+        moved = [
+            by_key[row["external_id"]].id
+            for row in unchanged
+            if by_key[row["external_id"]].city != row["city"] or by_key[row["external_id"]].deleted_at is not None
+        ]
+        await update_neighbors(db, embedded_ids + moved)
+    # новый вектор избранного места - вкус его поклонников считается заново
+    await refresh_tastes_for_places(db, embedded_ids)
+
+    await db.commit()
+
+    stats.total += len(records)
+    stats.embedded += len(changed)
+    stats.skipped += len(unchanged)
+    stats.chunks += 1
+    stats.cities.update(row["city"] for row in rows)
+    stats.cities.update(row.city for row in existing)
+    stats.updated_ids += [row.id for row in existing]
+
+
+async def ingest(
+    db: AsyncSession,
+    records: AsyncIterable[dict],
+    chunk_size: int = 500,
+    progress: Callable[[IngestStats], None] | None = None,
+    neighbors: bool | None = None,
+    stats: IngestStats | None = None,
+) -> IngestStats:
+    """neighbors=False - не трогать place_neighbors (большая загрузка, потом rebuild_neighbors).
+
+    stats можно передать свой: если импорт оборвется, в нем останутся уже
+    закоммиченные чанки - их нужно довести до индексов и кэша поиска.
+    """
+    if not 1 <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size должен быть от 1 до {MAX_CHUNK_SIZE}")
+    if neighbors is None:
+        neighbors = settings.SIMILAR_UPDATE_ON_WRITE
+    if stats is None:
+        stats = IngestStats()
+    async for chunk in iter_chunks(records, chunk_size):
+        await ingest_chunk(db, chunk, stats, neighbors)
+        if progress:
+            progress(stats)
+    return stats
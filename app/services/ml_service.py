@@ -1,18 +1,256 @@
 import asyncio
+import logging
+import math
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
-from sentence_transformers import SentenceTransformer
 
+from app.core.config import settings
+from app.core.metrics import stage_seconds
+from app.services.admission import admission
+from app.services.batcher import EmbeddingBatcher
+from app.services.embedding_backends import create_backend
+from app.services.embedding_cache import EmbeddingCache, normalize_text
+from app.services.embedding_client import EmbeddingClient, EmbeddingServerUnavailable
 
-model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
+logger = logging.getLogger(__name__)
 
 
-executor = ThreadPoolExecutor(max_workers=2) 
+# Модель грузится лениво: в фоне из lifespan (app/main.py) или при первом encode
+# (seed.py, ingest.py). Импорт модуля ничего тяжелого не делает.
+backend = None
+model_error: str | None = None
+model_load_seconds: float | None = None
+_backend_lock = threading.Lock()
 
-def _compute_embedding(text: str) -> list[float]:
-    return model.encode(text, normalize_embeddings=True).tolist()
 
-async def get_embedding(text: str) -> list[float]:
+class ModelExecutor(ThreadPoolExecutor):
+    """Потоки модели; сам считает отданные, начатые и законченные задачи (батчи)"""
+
+    def __init__(self, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self._counter_lock = threading.Lock()
+        self.submitted = 0
+        self.started = 0
+        self.finished = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._counter_lock:
+            self.submitted += 1
+        try:
+            return super().submit(self._run, fn, *args, **kwargs)
+        except BaseException:
+            with self._counter_lock:
+                self.submitted -= 1
+            raise
+
+    def _run(self, fn, *args, **kwargs):
+        with self._counter_lock:
+            self.started += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._counter_lock:
+                self.finished += 1
+
+    def queue_depth(self) -> int:
+        """Ждут свободный поток"""
+        return self.submitted - self.started
+
+    def in_flight(self) -> int:
+        """Ждут или считаются"""
+        return self.submitted - self.finished
+
+
+executor = ModelExecutor(max_workers=settings.EMBEDDING_WORKERS)
+
+# с EMBEDDING_SERVER_SOCKET векторы считает общий сервер, своя модель - только запасной путь
+_fallback_task: asyncio.Task | None = None
+# своя модель загружена как запасная: выгружаем, когда сервер снова отвечает
+_fallback_loaded = False
+embedding_client = (
+    EmbeddingClient(
+        settings.EMBEDDING_SERVER_SOCKET,
+        pool_size=settings.EMBEDDING_SERVER_POOL_SIZE,
+        timeout=settings.EMBEDDING_SERVER_TIMEOUT,
+        retry_seconds=settings.EMBEDDING_SERVER_RETRY_SECONDS,
+    )
+    if settings.EMBEDDING_SERVER_SOCKET
+    else None
+)
+
+def load_backend():
+    global backend, model_error, model_load_seconds
+    with _backend_lock:
+        if backend is not None:
+            return backend
+
+        started = time.perf_counter()
+        try:
+            loaded = create_backend(
+                settings.EMBEDDING_BACKEND,
+                settings.EMBEDDING_MODEL,
+                settings.ONNX_MODEL_DIR,
+                threads=settings.ONNX_THREADS,
+                local_files_only=settings.HF_OFFLINE,
+            )
+            # прогрев: первый encode выделяет буферы и сильно медленнее остальных
+            loaded.encode(["прогрев модели"])
+        except Exception as e:
+            model_error = f"{type(e).__name__}: {e}"
+            raise
+
+        model_error = None
+        model_load_seconds = time.perf_counter() - started
+        backend = loaded
+        return backend
+
+def is_model_ready() -> bool:
+    if backend is not None:
+        return True
+    return embedding_client is not None and embedding_client.ready and embedding_client.available
+
+async def load_model_in_background():
+    global model_error
+    if embedding_client is not None:
+        if await embedding_client.wait_ready(settings.EMBEDDING_SERVER_STARTUP_TIMEOUT):
+            logger.info("Эмбеддинги считает сервер %s", settings.EMBEDDING_SERVER_SOCKET)
+            return
+        if not settings.EMBEDDING_SERVER_FALLBACK:
+            model_error = f"сервер эмбеддингов {settings.EMBEDDING_SERVER_SOCKET} не ответил"
+            logger.error("Не удалось дождаться модели: %s", model_error)
+            return
+        logger.warning("Сервер эмбеддингов %s не ответил - грузим модель в процессе", settings.EMBEDDING_SERVER_SOCKET)
+        await _load_fallback_model()
+        return
+
+    await load_local_model()
+
+async def load_local_model():
+    """Своя копия модели в этом процессе (для сервера эмбеддингов - единственная)"""
     loop = asyncio.get_running_loop()
-    vector = await loop.run_in_executor(executor, _compute_embedding, text)
+    try:
+        await loop.run_in_executor(executor, load_backend)
+        logger.info("Модель %s (%s) готова за %.1f с", settings.EMBEDDING_MODEL, settings.EMBEDDING_BACKEND, model_load_seconds)
+    except Exception:
+        logger.error("Не удалось загрузить модель: %s", model_error)
+
+def _compute_embeddings(texts: list[str]) -> list[list[float]]:
+    # один вызов encode на весь батч вместо N отдельных
+    model = load_backend()
+    with stage_seconds.time("inference"):
+        return model.encode(texts)
+
+batcher = EmbeddingBatcher(
+    _compute_embeddings,
+    executor,
+    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+    max_concurrent_batches=settings.EMBEDDING_WORKERS,
+    on_queue_wait=lambda wait: stage_seconds.observe("embed_queue_wait", wait),
+)
+
+cache = EmbeddingCache(
+    # векторы разных бэкендов чуть отличаются, не смешиваем их в кэше
+    f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_BACKEND}",
+    max_size=settings.EMBEDDING_CACHE_SIZE,
+    ttl=settings.EMBEDDING_CACHE_TTL,
+    path=settings.EMBEDDING_CACHE_PATH,
+)
+
+async def _embed_remote(texts: list[str], timeout: float, bulk: bool = False) -> list[list[float]] | None:
+    """Векторы от сервера эмбеддингов; None - считать в процессе.
+
+    EmbeddingServerUnavailable (нет связи, модель сервера грузится) уходит наверх
+    как 503, пока сбой не затянулся на EMBEDDING_SERVER_FALLBACK_AFTER - тогда
+    в фоне грузится своя модель. Ошибка encode на сервере (STATUS_ERROR) - не сбой.
+    """
+    if embedding_client is None:
+        return None
+    if backend is not None and not embedding_client.available:
+        return None  # своя модель уже есть, а сервер еще в паузе после сбоя
+    try:
+        with stage_seconds.time("embed_server"):
+            vectors = await embedding_client.embed(texts, timeout, bulk=bulk)
+    except EmbeddingServerUnavailable:
+        if backend is not None:
+            return None
+        if settings.EMBEDDING_SERVER_FALLBACK and embedding_client.outage_seconds >= settings.EMBEDDING_SERVER_FALLBACK_AFTER:
+            _start_fallback_model()
+        raise
+    _release_fallback_model()
+    return vectors
+
+async def _load_fallback_model():
+    global _fallback_loaded
+    await load_local_model()
+    _fallback_loaded = backend is not None
+
+def _start_fallback_model():
+    # сервер лежит долго: грузим свою модель в фоне, запросы до конца загрузки получают 503
+    global _fallback_task
+    if backend is None and (_fallback_task is None or _fallback_task.done()):
+        logger.warning(
+            "Сервер эмбеддингов не отвечает %.0f с - грузим модель в процессе", embedding_client.outage_seconds
+        )
+        _fallback_task = asyncio.get_running_loop().create_task(_load_fallback_model())
+
+def _release_fallback_model():
+    # сервер снова отвечает: запасная копия больше не нужна. Ждем, пока батчи
+    # своей модели досчитаются, иначе _compute_embeddings загрузил бы ее заново
+    global backend, _fallback_loaded
+    if _fallback_loaded and batcher.queue_depth() == 0 and executor.in_flight() == 0:
+        backend = None
+        _fallback_loaded = False
+        logger.info("Сервер эмбеддингов снова отвечает - своя модель выгружена")
+
+async def get_embedding(text: str, priority: str = "interactive") -> list[float]:
+    vector = await cache.get(text)
+    if vector is not None:
+        return vector
+
+    # в модель отдаем уже нормализованный текст, чтобы вектор в кэше
+    # совпадал с тем, что вернулся бы без кэша
+    normalized = normalize_text(text)
+    # попадания в кэш дешевые и идут мимо очереди; перегрузка - Overloaded (503)
+    async with admission.slot(priority):
+        remote = await _embed_remote([normalized], settings.EMBEDDING_SERVER_TIMEOUT)
+        vector = remote[0] if remote is not None else await batcher.embed(normalized)
+    await cache.put(text, vector)
     
-    return vector
\ No newline at end of file
+    return vector
+
+async def get_embeddings(texts: list[str], priority: str = "background") -> list[list[float]]:
+    """Пакетная векторизация для импорта: кэш + один большой encode на промахи"""
+    vectors = [await cache.get(text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+    if missing:
+        normalized = [normalize_text(texts[i]) for i in missing]
+        # таймаут на каждый батч модели, а не на весь чанк импорта
+        batches = math.ceil(len(normalized) / settings.EMBEDDING_MAX_BATCH_SIZE)
+        # весь чанк - один слот: пропускает интерактивные запросы вперед себя в очереди
+        async with admission.slot(priority):
+            computed = await _embed_remote(normalized, settings.EMBEDDING_SERVER_TIMEOUT * batches, bulk=True)
+            if computed is None:
+                # уже готовый батч, микро-батчер тут не нужен
+                loop = asyncio.get_running_loop()
+                computed = await loop.run_in_executor(executor, _compute_embeddings, normalized)
+        for i, vector in zip(missing, computed):
+            vectors[i] = vector
+            await cache.put(texts[i], vector)
+
+    return vectors
+
+def get_batcher_stats() -> dict:
+    return batcher.stats()
+
+def get_admission_stats() -> dict:
+    return admission.stats()
+
+def get_cache_stats() -> dict:
+    return cache.stats()
+
+def executor_queue_depth() -> int:
+    # батчи, ждущие свободный поток модели
+    return executor.queue_depth()
\ No newline at end of file
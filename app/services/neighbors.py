@@ -0,0 +1,210 @@
+from typing import Callable, Iterable
+
+import numpy as np
+from sqlalchemy import select, delete, func, or_, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_IS_LIVE, place_neighbors_table as neighbors
+from app.services.vector_search import tune_vector_search
+
+DIM = 768
+
+
+# --- полная пересборка: точный kNN блоками в numpy ---
+
+async def _load_scope(db: AsyncSession, city: str | None) -> tuple[np.ndarray, np.ndarray]:
+    """id и матрица эмбеддингов живых мест города (None - всего каталога)"""
+    stmt = select(Place.id, Place.embedding).where(PLACE_IS_LIVE, Place.embedding.is_not(None))
+    if city is not None:
+        stmt = stmt.where(Place.city == city)
+    stmt = stmt.order_by(Place.id).execution_options(yield_per=1000)
+
+    ids, vectors = [], []
+    async for place_id, embedding in await db.stream(stmt):
+        ids.append(place_id)
+        vectors.append(embedding)
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), DIM)
+    return np.asarray(ids, dtype=np.int64), matrix
+
+
+def block_neighbors(ids: np.ndarray, matrix: np.ndarray, start: int, stop: int, n: int) -> list[dict]:
+    """top-n соседей для мест ids[start:stop] среди всей матрицы.
+
+    Эмбеддинги нормированы: косинус - одно умножение матриц на блок,
+    память блока - (stop - start) x len(ids) float32.
+    """
+    k = min(n, len(ids) - 1)
+    if k <= 0:
+        return []
+
+    sims = matrix[start:stop] @ matrix.T
+    rows = np.arange(len(sims))
+    sims[rows, start + rows] = -np.inf  # само место себе не сосед
+
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+    return [
+        {"place_id": int(ids[start + i]), "neighbor_id": int(ids[j]), "distance": max(0.0, 1.0 - float(sim))}
+        for i in rows
+        for j, sim in zip(top[i], top_sims[i])
+    ]
+
+
+async def rebuild_neighbors(
+    db: AsyncSession,
+    batch_size: int | None = None,
+    progress: Callable[[str | None, int], None] | None = None,
+) -> int:
+    """Пересчитывает place_neighbors целиком; каждый город - своей транзакцией.
+
+    С SIMILAR_SAME_CITY=False весь каталог - одна матрица в памяти (~3 КБ на место).
+    """
+    batch_size = batch_size or settings.SIMILAR_BATCH_SIZE
+    if settings.SIMILAR_SAME_CITY:
+        scopes = list((await db.execute(select(Place.city).where(PLACE_IS_LIVE).distinct())).scalars())
+    else:
+        scopes = [None]
+
+    total = 0
+    for city in scopes:
+        ids, matrix = await _load_scope(db, city)
+
+        # старые списки города уходят в той же транзакции: /similar не увидит пустоты
+        stmt = delete(neighbors)
+        if city is not None:
+            stmt = stmt.where(neighbors.c.place_id.in_(select(Place.id).where(Place.city == city)))
+        await db.execute(stmt)
+
+        for start in range(0, len(ids), batch_size):
+            rows = block_neighbors(ids, matrix, start, start + batch_size, settings.SIMILAR_NEIGHBORS)
+            if rows:
+                await db.execute(pg_insert(neighbors), rows)
+        await db.commit()
+
+        total += len(ids)
+        if progress:
+            progress(city, len(ids))
+    return total
+
+
+# --- инкрементально: после записи мест, через ANN-индекс ---
+
+async def _nearest(db: AsyncSession, place_ids: list[int], k: int) -> dict[int, list[tuple[int, float]]]:
+    """k ближайших для каждого из place_ids одним запросом (LATERAL + HNSW на каждое место)"""
+    if not place_ids:
+        return {}
+
+    source = aliased(Place)
+    neighbor = aliased(Place)
+    distance = neighbor.embedding.cosine_distance(source.embedding)
+
+    nearest = select(neighbor.id.label("neighbor_id"), distance.label("distance")).where(
+        neighbor.id != source.id, neighbor.deleted_at.is_(None)
+    )
+    if settings.SIMILAR_SAME_CITY:
+        nearest = nearest.where(neighbor.city == source.city)
+    nearest = nearest.order_by(distance).limit(k).lateral()
+
+    stmt = (
+        select(source.id, nearest.c.neighbor_id, nearest.c.distance)
+        .select_from(source)
+        .join(nearest, true())
+        .where(source.id.in_(place_ids), source.deleted_at.is_(None), source.embedding.is_not(None))
+    )
+    await tune_vector_search(db, k, filtered=settings.SIMILAR_SAME_CITY)
+
+    result: dict[int, list[tuple[int, float]]] = {}
+    for place_id, neighbor_id, dist in (await db.execute(stmt)).all():
+        result.setdefault(place_id, []).append((neighbor_id, dist))
+    return result
+
+
+async def update_neighbors(db: AsyncSession, place_ids: Iterable[int]):
+    """Списки для новых/измененных/удаленных мест и соседних списков, которые они задевают.
+
+    1. свои списки мест считаются заново (удаленные просто очищаются);
+    2. списки, где эти места стояли соседями, пересчитываются - вектор или город мог смениться;
+    3. новое место вставляется в чужой список, если оно ближе его худшего соседа -
+       кандидатов берем из N * SIMILAR_REVERSE_FACTOR ближайших к месту.
+    Коммит - на вызывающем.
+    """
+    place_ids = list(place_ids)
+    if not place_ids:
+        return
+    n = settings.SIMILAR_NEIGHBORS
+
+    stale = list((await db.execute(
+        select(neighbors.c.place_id)
+        .where(neighbors.c.neighbor_id.in_(place_ids), neighbors.c.place_id.not_in(place_ids))
+        .distinct()
+    )).scalars())
+    await db.execute(
+        delete(neighbors).where(
+            or_(
+                neighbors.c.place_id.in_([*place_ids, *stale]),
+                neighbors.c.neighbor_id.in_(place_ids),
+            )
+        )
+    )
+
+    candidates = await _nearest(db, place_ids, n * settings.SIMILAR_REVERSE_FACTOR)
+    rebuilt = await _nearest(db, stale, n)
+
+    rows = [
+        {"place_id": place_id, "neighbor_id": neighbor_id, "distance": dist}
+        for lists in (candidates, rebuilt)
+        for place_id, nearest in lists.items()
+        for neighbor_id, dist in nearest[:n]
+    ]
+
+    # обратные ссылки: место q получает соседа p, если p ближе худшего в списке q
+    recomputed = set(place_ids) | set(stale)
+    reverse = [
+        (neighbor_id, place_id, dist)
+        for place_id, nearest in candidates.items()
+        for neighbor_id, dist in nearest
+        if neighbor_id not in recomputed
+    ]
+    touched = sorted({q for q, _, _ in reverse})
+    if touched:
+        worst = {
+            q: (count, max_distance)
+            for q, count, max_distance in (await db.execute(
+                select(neighbors.c.place_id, func.count(), func.max(neighbors.c.distance))
+                .where(neighbors.c.place_id.in_(touched))
+                .group_by(neighbors.c.place_id)
+            )).all()
+        }
+        for q, p, dist in reverse:
+            count, max_distance = worst.get(q, (0, None))
+            if count < n or dist < max_distance:
+                rows.append({"place_id": q, "neighbor_id": p, "distance": dist})
+
+    if rows:
+        await db.execute(pg_insert(neighbors).on_conflict_do_nothing(), rows)
+
+    if touched:
+        # в списки добавились соседи - оставляем n ближайших
+        ranked = (
+            select(
+                neighbors.c.place_id,
+                neighbors.c.neighbor_id,
+                func.row_number().over(partition_by=neighbors.c.place_id, order_by=neighbors.c.distance).label("rank"),
+            )
+            .where(neighbors.c.place_id.in_(touched))
+            .subquery()
+        )
+        await db.execute(
+            delete(neighbors).where(
+                neighbors.c.place_id == ranked.c.place_id,
+                neighbors.c.neighbor_id == ranked.c.neighbor_id,
+                ranked.c.rank > n,
+            )
+        )
@@ -0,0 +1,160 @@
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import select, update, func, case, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE
+from app.models.user import favorites_table, user_tastes_table as tastes
+from app.services.vector_index import vector_index
+from app.services.vector_search import nearest_places
+
+
+# --- поддержка вкуса: вызывать в транзакции, которая меняет favorites или эмбеддинги мест ---
+
+# первый ключ pg_advisory_xact_lock(int, int), второй - id пользователя
+TASTE_LOCK = 718205
+
+
+async def refresh_tastes(db: AsyncSession, user_ids: Iterable[int]):
+    """Сумма и число эмбеддингов избранного заново из favorites JOIN places.
+
+    Для смены эмбеддингов мест (импорт), массовых изменений избранного и
+    каскадов. Блокировка на пользователя: дельта из add_to_taste/remove_from_taste
+    ждет коммита пересчета и ложится поверх него, а не затирается им.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        await db.execute(select(func.pg_advisory_xact_lock(TASTE_LOCK, user_id)))
+
+    totals = (
+        select(favorites_table.c.user_id, func.sum(Place.embedding), func.count())
+        .join(Place, Place.id == favorites_table.c.place_id)
+        .where(favorites_table.c.user_id.in_(user_ids), Place.embedding.is_not(None))
+        .group_by(favorites_table.c.user_id)
+    )
+    stmt = pg_insert(tastes).from_select(["user_id", "embedding_sum", "favorites_count"], totals)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tastes.c.user_id],
+        set_={
+            "embedding_sum": stmt.excluded.embedding_sum,
+            "favorites_count": stmt.excluded.favorites_count,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+    # избранного с эмбеддингами не осталось - вкуса нет
+    await db.execute(
+        update(tastes)
+        .where(
+            tastes.c.user_id.in_(user_ids),
+            tastes.c.user_id.not_in(totals.with_only_columns(favorites_table.c.user_id)),
+        )
+        .values(embedding_sum=None, favorites_count=0, updated_at=func.now())
+    )
+
+
+async def _lock_taste(db: AsyncSession, user_id: int, place_id: int):
+    # FOR SHARE на место: импорт, меняющий его эмбеддинг, ждет нашего коммита
+    # (и потом пересчитает вкус уже с этим избранным) или мы ждем его и видим
+    # новый вектор. Порядок как у импорта - сначала место, потом вкус, иначе дедлок
+    await db.execute(select(Place.id).where(Place.id == place_id).with_for_update(read=True))
+    await db.execute(select(func.pg_advisory_xact_lock(TASTE_LOCK, user_id)))
+
+
+async def add_to_taste(db: AsyncSession, user_id: int, place_id: int):
+    """Одно место добавлено в избранное: сумма += его эмбеддинг, счетчик += 1"""
+    await _lock_taste(db, user_id, place_id)
+    place = select(literal(user_id), Place.embedding, literal(1)).where(
+        Place.id == place_id, Place.embedding.is_not(None)
+    )
+    stmt = pg_insert(tastes).from_select(["user_id", "embedding_sum", "favorites_count"], place)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tastes.c.user_id],
+        set_={
+            "embedding_sum": case(
+                (tastes.c.embedding_sum.is_(None), stmt.excluded.embedding_sum),
+                else_=tastes.c.embedding_sum + stmt.excluded.embedding_sum,
+            ),
+            "favorites_count": tastes.c.favorites_count + 1,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def remove_from_taste(db: AsyncSession, user_id: int, place_id: int):
+    """Одно место убрано из избранного: сумма -= его эмбеддинг, счетчик -= 1.
+
+    Вычитаем текущий эмбеддинг: сумма всегда из текущих, при его смене
+    refresh_tastes_for_places пересчитывает вкус целиком.
+    """
+    await _lock_taste(db, user_id, place_id)
+    embedding = select(Place.embedding).where(Place.id == place_id).scalar_subquery()
+    await db.execute(
+        update(tastes)
+        .where(tastes.c.user_id == user_id, tastes.c.favorites_count > 0, embedding.is_not(None))
+        .values(
+            # последнее место ушло - вкуса нет (а не нулевой вектор с ошибкой округления)
+            embedding_sum=case((tastes.c.favorites_count > 1, tastes.c.embedding_sum - embedding), else_=None),
+            favorites_count=tastes.c.favorites_count - 1,
+            updated_at=func.now(),
+        )
+    )
+
+
+async def refresh_tastes_for_places(db: AsyncSession, place_ids: list[int]):
+    """После смены эмбеддингов мест (импорт): вкус всех, у кого они в избранном"""
+    if not place_ids:
+        return
+    users = await db.execute(
+        select(favorites_table.c.user_id).where(favorites_table.c.place_id.in_(place_ids)).distinct()
+    )
+    await refresh_tastes(db, users.scalars())
+
+
+# --- лента ---
+
+async def taste_vector(db: AsyncSession, user_id: int) -> list[float] | None:
+    """Нормированный центроид избранного (None - избранного еще нет)"""
+    result = await db.execute(
+        select(tastes.c.embedding_sum).where(tastes.c.user_id == user_id, tastes.c.favorites_count > 0)
+    )
+    embedding_sum = result.scalar()
+    if embedding_sum is None:
+        return None
+    vector = np.asarray(embedding_sum, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    # numpy-индекс считает расстояние как 1 - dot, ему нужен единичный вектор
+    return (vector / norm).tolist() if norm > 0 else None
+
+
+async def recommend(db: AsyncSession, user_id: int, limit: int, city: str | None = None) -> list:
+    """Места, ближайшие ко вкусу пользователя, без уже избранных"""
+    query_vector = await taste_vector(db, user_id)
+    if query_vector is None:
+        return []
+
+    favorited = select(favorites_table.c.place_id).where(favorites_table.c.user_id == user_id)
+
+    if settings.SEARCH_BACKEND == "numpy" and vector_index.ready:
+        # тот же индекс, что у /search/ai: берем с запасом на избранное и отсеиваем его
+        seen = set((await db.execute(favorited)).scalars())
+        hits = [
+            place_id
+            for place_id, _ in await vector_index.asearch(query_vector, city, limit + len(seen))
+            if place_id not in seen
+        ][:limit]
+        if not hits:
+            return []
+        result = await db.execute(select(*PLACE_RESPONSE_COLUMNS).where(Place.id.in_(hits), PLACE_IS_LIVE))
+        places = {row.id: row for row in result.all()}
+        return [places[place_id] for place_id in hits if place_id in places]
+
+    rows = await nearest_places(db, query_vector, limit, city, exclude=favorited)
+    return [row for row, _ in rows]
@@ -0,0 +1,171 @@
+import hashlib
+import json
+from typing import Any, Iterable
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE
+from app.services.embedding_cache import LRUCache
+
+PLACE_RESPONSE_FIELDS = tuple(column.key for column in PLACE_RESPONSE_COLUMNS)
+
+# версия каталога для поиска без города: растет при любой записи
+ALL_CITIES = "*"
+
+
+class LocalBackend:
+    """Кэш внутри процесса: LRU для значений + счетчики версий (их не вытесняем)"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self._values = LRUCache(max_size=max_size, ttl=ttl)
+        self._counters: dict[str, int] = {}
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        # версии и значения читаются одним вызовом, как MGET в Redis
+        return [self._counters[key] if key in self._counters else self._values.get(key) for key in keys]
+
+    async def set_many(self, items: dict[str, Any]):
+        for key, value in items.items():
+            self._values.put(key, value)
+
+    async def delete_many(self, keys: list[str]):
+        for key in keys:
+            self._values.pop(key)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class RedisBackend:
+    """Общий кэш для всех воркеров и хостов (значения - JSON)"""
+
+    def __init__(self, url: str, ttl: float):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("Для SEARCH_CACHE_BACKEND=redis нужен redis: uv sync --extra redis") from e
+
+        self._redis = redis.from_url(url)
+        self.ttl = int(ttl) or None
+
+    async def get_many(self, keys: list[str]) -> list[Any]:
+        return [json.loads(value) if value is not None else None for value in await self._redis.mget(keys)]
+
+    async def set_many(self, items: dict[str, Any]):
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+            await pipe.execute()
+
+    async def delete_many(self, keys: list[str]):
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def incr(self, key: str) -> int:
+        # версии живут без TTL: потеря версии вернула бы к жизни старые записи
+        return await self._redis.incr(key)
+
+    def __len__(self):
+        return 0  # размер общего кэша смотрим в самом Redis
+
+
+class SearchResultCache:
+    """Кэш результатов /search/ai и /search/filters: храним только id мест.
+
+    В ключ входит версия каталога города (и глобальная эпоха), версию читаем
+    до запроса в БД. Запись места поднимает версию - старые ключи больше
+    никогда не спрашиваются и просто вытесняются, полного сброса не нужно.
+    Сами строки мест лежат отдельно по id и собираются при попадании.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_keys(city: str | None) -> list[str]:
+        return ["catalog:epoch", f"catalog:version:{city or ALL_CITIES}"]
+
+    async def lookup(self, kind: str, params: dict, city: str | None) -> tuple[str, list[int] | None]:
+        """Возвращает ключ (для store) и id мест, если результат уже есть"""
+        epoch, version = await self.backend.get_many(self._version_keys(city))
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        key = f"search:{kind}:{epoch or 0}:{version or 0}:{digest}"
+
+        ids = (await self.backend.get_many([key]))[0]
+        if ids is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, ids
+
+    async def store(self, key: str, rows: Iterable):
+        rows = list(rows)
+        epoch = (await self.backend.get_many(["catalog:epoch"]))[0] or 0
+        items = {self._place_key(epoch, row.id): self._place_snapshot(row) for row in rows}
+        items[key] = [row.id for row in rows]
+        await self.backend.set_many(items)
+
+    async def hydrate(self, db, ids: list[int]) -> list[dict]:
+        """Строки мест по id: из кэша, недостающие - одним запросом в БД"""
+        epoch = (await self.backend.get_many(["catalog:epoch"]))[0] or 0
+        cached = await self.backend.get_many([self._place_key(epoch, place_id) for place_id in ids])
+        places = {place["id"]: place for place in cached if place is not None}
+
+        missing = [place_id for place_id in ids if place_id not in places]
+        if missing:
+            result = await db.execute(select(*PLACE_RESPONSE_COLUMNS).where(Place.id.in_(missing), PLACE_IS_LIVE))
+            fetched = {row.id: self._place_snapshot(row) for row in result.all()}
+            await self.backend.set_many({self._place_key(epoch, place_id): place for place_id, place in fetched.items()})
+            places.update(fetched)
+
+        # место могли удалить (надгробие) между запросами - просто пропускаем
+        return [places[place_id] for place_id in ids if place_id in places]
+
+    async def invalidate(self, cities: Iterable[str], place_ids: Iterable[int] = ()):
+        """Вызывать после записи мест: поднимает версии городов и выкидывает измененные строки"""
+        for city in {*cities, ALL_CITIES}:
+            await self.backend.incr(f"catalog:version:{city}")
+
+        place_ids = list(place_ids)
+        if place_ids:
+            epoch = (await self.backend.get_many(["catalog:epoch"]))[0] or 0
+            await self.backend.delete_many([self._place_key(epoch, place_id) for place_id in place_ids])
+
+    async def reset(self):
+        """После TRUNCATE (seed.py): id переиспользуются, поэтому меняем эпоху целиком"""
+        await self.backend.incr("catalog:epoch")
+
+    @staticmethod
+    def _place_key(epoch: int, place_id: int) -> str:
+        return f"place:{epoch}:{place_id}"
+
+    @staticmethod
+    def _place_snapshot(row) -> dict:
+        return {name: getattr(row, name) for name in PLACE_RESPONSE_FIELDS}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self.backend),
+        }
+
+
+def create_search_cache() -> SearchResultCache | None:
+    if settings.SEARCH_CACHE_BACKEND == "off":
+        return None
+    if settings.SEARCH_CACHE_BACKEND == "redis":
+        return SearchResultCache(RedisBackend(settings.SEARCH_CACHE_URL, settings.SEARCH_CACHE_TTL))
+    return SearchResultCache(LocalBackend(settings.SEARCH_CACHE_SIZE, settings.SEARCH_CACHE_TTL))
+
+
+search_cache = create_search_cache()
@@ -0,0 +1,180 @@
+import re
+from bisect import bisect_left, insort
+
+from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.place import Place, PLACE_IS_LIVE, SYNC_WATERMARK, CATALOG_EPOCH
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def suggest_key(text: str) -> str:
+    """Ключ для сравнения префиксов: регистр, ё/е и пунктуация не важны"""
+    return " ".join(WORD_RE.findall(text.lower().replace("ё", "е")))
+
+
+def _tails(key: str) -> list[str]:
+    """Хвосты ключа со второго слова и дальше"""
+    return [key[i + 1:] for i, char in enumerate(key) if char == " "]
+
+
+class _CityNames:
+    """Отсортированные ключи названий одного города.
+
+    heads - название целиком, words - хвосты со второго слова и дальше
+    ("эрмитаж" для "государственный эрмитаж"). Префикс - бинарный поиск
+    и проход вперед, пока ключи с него начинаются.
+    """
+
+    def __init__(self):
+        self.heads: list[tuple[str, int]] = []
+        self.words: list[tuple[str, int]] = []
+
+    def add(self, place_id: int, key: str):
+        insort(self.heads, (key, place_id))
+        for tail in _tails(key):
+            insort(self.words, (tail, place_id))
+
+    def remove(self, place_id: int, key: str):
+        _discard(self.heads, (key, place_id))
+        for tail in _tails(key):
+            _discard(self.words, (tail, place_id))
+
+    def __len__(self):
+        return len(self.heads)
+
+
+def _discard(entries: list[tuple[str, int]], entry: tuple[str, int]):
+    i = bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+def _scan(entries: list[tuple[str, int]], prefix: str):
+    for i in range(bisect_left(entries, (prefix,)), len(entries)):
+        key, place_id = entries[i]
+        if not key.startswith(prefix):
+            return
+        yield place_id
+
+
+class SuggestIndex:
+    """In-process автодополнение названий мест по городам.
+
+    Собирается на старте из БД, дальше догоняет каталог по places.change_xid
+    (тот же курсор, что у /places/export): новые, переименованные и удаленные
+    места. Нажатия клавиш не трогают ни модель, ни базу.
+    """
+
+    def __init__(self):
+        self.cities: dict[str, _CityNames] = {}
+        # place_id -> (город, название, ключ): чтобы убрать старую запись при изменении
+        self.places: dict[int, tuple[str, str, str]] = {}
+        self.epoch = 0
+        self.xmin = 0
+        self.ready = False
+
+    def __len__(self):
+        return len(self.places)
+
+    async def load(self, db: AsyncSession):
+        cities: dict[str, _CityNames] = {}
+        places = {}
+        epoch, xmin = (await db.execute(select(CATALOG_EPOCH, SYNC_WATERMARK))).one()
+        stmt = (
+            select(Place.id, Place.city, Place.name)
+            .where(PLACE_IS_LIVE)
+            .execution_options(yield_per=5000)
+        )
+        async for place_id, city, name in await db.stream(stmt):
+            key = suggest_key(name)
+            places[place_id] = (city, name, key)
+            names = cities.setdefault(city, _CityNames())
+            # при полной сборке сортируем один раз в конце, а не insort на каждую строку
+            names.heads.append((key, place_id))
+            names.words.extend((tail, place_id) for tail in _tails(key))
+        for names in cities.values():
+            names.heads.sort()
+            names.words.sort()
+
+        self.cities, self.places, self.epoch, self.xmin = cities, places, epoch, xmin
+        self.ready = True
+
+    async def refresh(self, db: AsyncSession) -> int:
+        """Применяет изменения каталога после прошлого курсора.
+
+        Идет по ix_places_change_xid; курсор - xmin снимка, взятый до чтения
+        (миграция f4c2a8e6b1d3), так что изменение, закоммиченное позже, не пропадет,
+        а недавние строки могут прийти повторно - применение идемпотентно.
+        Каталог перезалит (TRUNCATE сменил эпоху) - собираемся заново.
+        """
+        epoch, xmin = (await db.execute(select(CATALOG_EPOCH, SYNC_WATERMARK))).one()
+        if epoch != self.epoch:
+            await self.load(db)
+            return len(self.places)
+        stmt = (
+            select(Place.id, Place.city, Place.name, Place.deleted_at)
+            .where(Place.change_xid >= self.xmin)
+            .order_by(Place.change_xid)
+        )
+        rows = (await db.execute(stmt)).all()
+        for place_id, city, name, deleted_at in rows:
+            self._remove(place_id)
+            if deleted_at is None:
+                self._add(place_id, city, name)
+        self.xmin = xmin
+        return len(rows)
+
+    def _add(self, place_id: int, city: str, name: str):
+        key = suggest_key(name)
+        self.places[place_id] = (city, name, key)
+        self.cities.setdefault(city, _CityNames()).add(place_id, key)
+
+    def _remove(self, place_id: int):
+        old = self.places.pop(place_id, None)
+        if old is not None:
+            city, _, key = old
+            self.cities[city].remove(place_id, key)
+
+    def suggest(self, query: str, city: str, limit: int) -> list[dict]:
+        """Сначала названия, начинающиеся с запроса, потом - со слова внутри названия"""
+        prefix = suggest_key(query)
+        names = self.cities.get(city)
+        if not prefix or names is None:
+            return []
+
+        found: list[int] = []
+        for entries in (names.heads, names.words):
+            for place_id in _scan(entries, prefix):
+                if place_id not in found:
+                    found.append(place_id)
+                    if len(found) == limit:
+                        break
+            if len(found) == limit:
+                break
+        return [{"id": place_id, "name": self.places[place_id][1], "city": city} for place_id in found]
+
+
+async def db_suggest(db: AsyncSession, query: str, city: str, limit: int):
+    """Через БД (GIN pg_trgm по name): пока индекс в памяти не собран и для опечаток.
+
+    ILIKE '%...%' и оператор % (similarity) обслуживает один и тот же ix_places_name_trgm.
+    """
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    similarity = func.similarity(Place.name, query)
+    stmt = (
+        select(Place.id, Place.name, Place.city)
+        .where(
+            PLACE_IS_LIVE,
+            Place.city == city,
+            or_(Place.name.ilike(f"%{escaped}%"), Place.name.op("%")(query)),
+        )
+        # начало названия - выше, дальше по похожести
+        .order_by(Place.name.ilike(f"{escaped}%").desc(), similarity.desc(), Place.id)
+        .limit(limit)
+    )
+    return (await db.execute(stmt)).mappings().all()
+
+
+suggest_index = SuggestIndex()
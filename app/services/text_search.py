@@ -0,0 +1,60 @@
+import re
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE
+
+# Полнотекстовый поиск по places.search_tsv (generated-колонка + GIN, миграция 75189e24fcbe).
+# Название лежит с весом A в двух конфигурациях: russian (стемминг) и simple
+# (бренды и латиница вроде "Skuratov"), описание - B, search_context - C.
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def name_tsquery(query: str):
+    """Все слова запроса должны встретиться в названии (метка :A)"""
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    return func.to_tsquery("simple", " & ".join(f"{word}:A" for word in words))
+
+
+def lexical_tsquery(query: str):
+    # websearch_to_tsquery не падает на произвольном вводе пользователя
+    return func.websearch_to_tsquery("russian", query).op("||")(func.websearch_to_tsquery("simple", query))
+
+
+async def name_matches(db: AsyncSession, query: str, city: str | None, limit: int):
+    tsquery = name_tsquery(query)
+    if tsquery is None:
+        return []
+
+    stmt = select(*PLACE_RESPONSE_COLUMNS).where(Place.search_tsv.op("@@")(tsquery), PLACE_IS_LIVE)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    # короткое название = более точное попадание ("Эрмитаж" раньше "Кафе в Эрмитаже")
+    stmt = stmt.order_by(func.length(Place.name), Place.id).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def lexical_matches(db: AsyncSession, query: str, city: str | None, limit: int):
+    tsquery = lexical_tsquery(query)
+    rank = func.ts_rank_cd(Place.search_tsv, tsquery)
+
+    stmt = select(*PLACE_RESPONSE_COLUMNS).where(Place.search_tsv.op("@@")(tsquery), PLACE_IS_LIVE)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    stmt = stmt.order_by(rank.desc(), Place.id).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """RRF: score(id) = sum(1 / (k + rank)) по всем спискам"""
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item_id: -scores[item_id])
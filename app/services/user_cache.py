@@ -0,0 +1,57 @@
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.embedding_cache import LRUCache
+
+# Поля пользователя, которые держим в кэше (без связей)
+USER_FIELDS = ("id", "email", "username", "hashed_password", "token_version")
+
+
+class UserCache:
+    """Короткоживущий кэш пользователей для get_current_user, ключ - sub из токена.
+
+    Храним снапшот полей, а не ORM-объект: каждый запрос получает свой
+    detached User, так что одновременные сессии не делят один экземпляр.
+    Кэш локальный для процесса - в других воркерах изменения видны через TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self._lru = LRUCache(max_size=max_size, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, email: str) -> dict | None:
+        snapshot = self._lru.get(email)
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def put(self, user: User) -> dict:
+        snapshot = {name: getattr(user, name) for name in USER_FIELDS}
+        self._lru.put(user.email, snapshot)
+        return snapshot
+
+    def invalidate(self, email: str):
+        self._lru.pop(email)
+
+    @staticmethod
+    def to_user(snapshot: dict) -> User:
+        # detached-объект с identity: db.add() в update_user_profile сделает UPDATE, а не INSERT
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return user
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._lru),
+        }
+
+
+user_cache = UserCache(max_size=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
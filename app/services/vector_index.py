@@ -0,0 +1,271 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_IS_LIVE, SYNC_WATERMARK, CATALOG_EPOCH
+
+DIM = 768
+
+
+EMPTY_DELTA = (np.empty(0, dtype=np.int64), np.empty((0, DIM), dtype=np.float32), [])
+
+# снапшот пересобирается при загрузке, если с его версии изменилось больше этой доли мест
+REBUILD_FRACTION = 0.1
+# сколько последних каталогов снапшота держать на диске (см. _prune_snapshots)
+KEEP_SNAPSHOTS = 2
+
+
+class VectorIndex:
+    """In-process точный top-k по эмбеддингам мест (альтернатива pgvector).
+
+    Снапшот на диске: матрица float32, отсортированная по (city, id), так что
+    каждый город - непрерывный срез. Матрица открывается через mmap, поэтому
+    воркеры на одном хосте делят одни и те же страницы.
+    Изменения после снапшота догоняются по places.change_xid (как /places/export):
+    измененные и удаленные строки снапшота гасятся маской, актуальные версии
+    мест лежат в небольшой дельте в памяти.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = Path(snapshot_dir)
+
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, DIM), dtype=np.float32)
+        self.cities: dict[str, tuple[int, int]] = {}
+        # False - строка снапшота устарела (место изменено или удалено)
+        self.alive = np.empty(0, dtype=bool)
+        self._by_id = np.empty(0, dtype=np.int64)  # позиции снапшота в порядке id
+
+        # (ids, матрица, города) одним атрибутом: поиск в потоке не увидит их рассогласованными
+        self.delta: tuple[np.ndarray, np.ndarray, list[str]] = EMPTY_DELTA
+
+        self.epoch = 0
+        self.xmin = 0
+        self.snapshot_xmin = 0  # xmin, на котором построен открытый снапшот
+        self.ready = False
+
+    def __len__(self):
+        return int(self.alive.sum()) + len(self.delta[0])
+
+    # --- загрузка ---
+
+    async def load(self, db: AsyncSession):
+        """Поднимает индекс из снапшота и догоняет изменения; чужой или сильно устаревший - пересобирает"""
+        epoch = (await db.execute(select(CATALOG_EPOCH))).scalar()
+        meta = self._read_meta()
+        if meta is None or "xmin" not in meta or meta.get("epoch") != epoch:
+            # каталог перезалит (seed.py): id переиспользованы, снапшот не от этих данных
+            await self._build_snapshot(db)
+        else:
+            changed = (await db.execute(select(func.count()).where(Place.change_xid >= meta["xmin"]))).scalar()
+            if changed > REBUILD_FRACTION * meta["count"]:
+                await self._build_snapshot(db)
+
+        if not await self._open_and_refresh(db) or not await self._snapshot_matches(db):
+            # файлы не сходятся с meta или строки не те, хотя эпоха совпала
+            # (база восстановлена из бэкапа, снапшот с другого стенда)
+            await self._build_snapshot(db)
+            await self._open_and_refresh(db)
+        self.ready = True
+
+    async def _open_and_refresh(self, db: AsyncSession) -> bool:
+        if not self._open_snapshot():
+            return False
+        self.delta = EMPTY_DELTA
+        await self.refresh(db)
+        return True
+
+    async def _snapshot_matches(self, db: AsyncSession) -> bool:
+        """Живые строки снапшота после refresh - ровно места, не менявшиеся с его xmin"""
+        count, id_sum = (
+            await db.execute(
+                select(func.count(), func.coalesce(func.sum(Place.id), 0)).where(
+                    PLACE_IS_LIVE, Place.embedding.is_not(None), Place.change_xid < self.snapshot_xmin
+                )
+            )
+        ).one()
+        alive = self.ids[self.alive]
+        return count == len(alive) and id_sum == int(alive.sum())
+
+    async def refresh(self, db: AsyncSession):
+        """Догоняет изменения мест (вставки, новые векторы, переезды, удаления) после self.xmin"""
+        # водяной знак - до чтения: закоммиченное позже попадет в следующий refresh
+        epoch, xmin = (await db.execute(select(CATALOG_EPOCH, SYNC_WATERMARK))).one()
+        if epoch != self.epoch:
+            # TRUNCATE places на живом сервисе: строки снапшота больше ничего не значат
+            await self.load(db)
+            return
+        stmt = (
+            select(Place.id, Place.city, Place.embedding, Place.deleted_at)
+            .where(Place.change_xid >= self.xmin)
+            .order_by(Place.change_xid)
+        )
+        # повторно пришедшие строки безвредны: add заменяет, remove идемпотентен
+        for place_id, city, embedding, deleted_at in (await db.execute(stmt)).all():
+            if deleted_at is None and embedding is not None:
+                self.add(place_id, city, embedding)
+            else:
+                self.remove(place_id)
+        self.xmin = xmin
+
+    async def _build_snapshot(self, db: AsyncSession):
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        epoch, xmin = (await db.execute(select(CATALOG_EPOCH, SYNC_WATERMARK))).one()
+        # каждый снапшот - в своем каталоге, на актуальный указывает симлинк current:
+        # подмена одним os.replace, соседний воркер не увидит матрицу от одного
+        # снапшота, а ids - от другого
+        build_dir = self.snapshot_dir / f"snapshot-{epoch}-{xmin}-{os.getpid()}-{time.time_ns()}"
+        build_dir.mkdir()
+
+        # все, что закоммичено после водяного знака, догонит refresh
+        live = (PLACE_IS_LIVE, Place.embedding.is_not(None))
+        count = (await db.execute(select(func.count()).where(*live))).scalar()
+
+        matrix = np.lib.format.open_memmap(build_dir / "matrix.npy", mode="w+", dtype=np.float32, shape=(count, DIM))
+        ids = np.empty(count, dtype=np.int64)
+        cities: dict[str, list[int]] = {}
+
+        stmt = (
+            select(Place.id, Place.city, Place.embedding)
+            .where(*live)
+            .order_by(Place.city, Place.id)
+            .execution_options(yield_per=1000)
+        )
+        row = 0
+        # стримим, чтобы не держать в памяти весь каталог
+        async for place_id, city, embedding in await db.stream(stmt):
+            if row >= count:
+                break
+            matrix[row] = embedding
+            ids[row] = place_id
+            bounds = cities.setdefault(city, [row, row])
+            bounds[1] = row + 1
+            row += 1
+
+        matrix.flush()
+        del matrix
+        with open(build_dir / "ids.npy", "wb") as f:
+            np.save(f, ids[:row])
+        # row может оказаться меньше count, если между count() и stream что-то удалили -
+        # тогда хвост матрицы просто не используется
+        (build_dir / "meta.json").write_text(json.dumps({"count": row, "epoch": epoch, "xmin": xmin, "cities": cities}))
+
+        link_tmp = self.snapshot_dir / f"current.{os.getpid()}.tmp"
+        link_tmp.unlink(missing_ok=True)
+        link_tmp.symlink_to(build_dir.name, target_is_directory=True)
+        os.replace(link_tmp, self.snapshot_dir / "current")
+        self._prune_snapshots()
+
+    def _prune_snapshots(self):
+        """Удаляет старые каталоги снапшотов, кроме current и KEEP_SNAPSHOTS самых свежих.
+
+        Свежие не трогаем: соседний воркер может как раз дописывать свой или открывать
+        предыдущий. Уже открытые через mmap файлы переживут удаление (Linux).
+        """
+        current = (self.snapshot_dir / "current").resolve()
+        builds = sorted(self.snapshot_dir.glob("snapshot-*"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in builds[KEEP_SNAPSHOTS:]:
+            if path.resolve() != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _read_meta(self, snapshot: Path | None = None) -> dict | None:
+        path = (snapshot or self.snapshot_dir / "current") / "meta.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def _open_snapshot(self) -> bool:
+        """Открывает снапшот, на который сейчас указывает current; False - файлы не сходятся с meta"""
+        # разыменовываем один раз: если current подменят посреди чтения, файлы все равно из одного каталога
+        snapshot = (self.snapshot_dir / "current").resolve()
+        meta = self._read_meta(snapshot)
+        if meta is None:
+            return False
+        matrix = np.load(snapshot / "matrix.npy", mmap_mode="r")
+        ids = np.load(snapshot / "ids.npy")
+        if len(ids) != meta["count"] or len(matrix) < meta["count"]:
+            return False
+        self.matrix = matrix[: meta["count"]]
+        self.ids = ids
+        self.cities = {city: tuple(bounds) for city, bounds in meta["cities"].items()}
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self._by_id = np.argsort(self.ids)
+        self.epoch = meta["epoch"]
+        self.snapshot_xmin = self.xmin = meta["xmin"]
+        return True
+
+    def _snapshot_position(self, place_id: int) -> int | None:
+        i = np.searchsorted(self.ids, place_id, sorter=self._by_id)
+        if i < len(self.ids) and self.ids[self._by_id[i]] == place_id:
+            return int(self._by_id[i])
+        return None
+
+    # --- изменения ---
+
+    def add(self, place_id: int, city: str, embedding):
+        """Добавляет или заменяет место (create_place, refresh) без пересборки снапшота"""
+        self.remove(place_id)
+        ids, matrix, cities = self.delta
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, DIM)
+        self.delta = (np.append(ids, place_id), np.vstack([matrix, vector]), [*cities, city])
+
+    def remove(self, place_id: int):
+        position = self._snapshot_position(place_id)
+        if position is not None:
+            self.alive[position] = False
+        ids, matrix, cities = self.delta
+        found = np.flatnonzero(ids == place_id)
+        if len(found):
+            i = int(found[0])
+            self.delta = (np.delete(ids, i), np.delete(matrix, i, axis=0), cities[:i] + cities[i + 1:])
+
+    # --- поиск ---
+
+    def search(self, query_vector, city: str | None, limit: int) -> list[tuple[int, float]]:
+        """Возвращает [(place_id, cosine_distance)] по возрастанию расстояния"""
+        query = np.asarray(query_vector, dtype=np.float32)
+
+        if city is None:
+            start, end = 0, len(self.ids)
+        else:
+            start, end = self.cities.get(city, (0, 0))
+        base_ids, base_matrix, base_alive = self.ids[start:end], self.matrix[start:end], self.alive[start:end]
+
+        delta_ids, delta_matrix, delta_cities = self.delta
+        if city is None:
+            delta_mask = slice(None)
+        else:
+            delta_mask = np.array([c == city for c in delta_cities], dtype=bool)
+
+        base_scores = base_matrix @ query
+        if not base_alive.all():
+            # устаревшие строки снапшота не должны занимать места в top-k
+            base_ids, base_scores = base_ids[base_alive], base_scores[base_alive]
+
+        ids = np.concatenate([base_ids, delta_ids[delta_mask]])
+        # эмбеддинги нормированы: cosine distance = 1 - dot
+        scores = np.concatenate([base_scores, delta_matrix[delta_mask] @ query])
+
+        if len(scores) == 0:
+            return []
+
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # порядок как в pgvector: по расстоянию, при равенстве - по id
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return [(int(ids[i]), float(1.0 - scores[i])) for i in top]
+
+    async def asearch(self, query_vector, city: str | None, limit: int) -> list[tuple[int, float]]:
+        # matmul отпускает GIL, не держим event loop на больших городах
+        return await asyncio.to_thread(self.search, query_vector, city, limit)
+
+
+vector_index = VectorIndex(settings.VECTOR_SNAPSHOT_DIR)
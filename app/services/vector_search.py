@@ -0,0 +1,146 @@
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import select, text, cast, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS, PLACE_IS_LIVE
+
+# hnsw.ef_search больше 1000 pgvector не принимает
+MAX_EF_SEARCH = 1000
+
+# Пресеты качества поиска: (hnsw.ef_search, ivfflat.probes)
+QUALITY_PRESETS = {
+    "fast": (20, 1),
+    "balanced": (settings.HNSW_EF_SEARCH, settings.IVFFLAT_PROBES),
+    "accurate": (200, max(settings.IVFFLAT_LISTS // 2, 1)),
+}
+
+
+def model_tag() -> str:
+    # векторы разных моделей и бэкендов несравнимы: свой порог, свои ключи кэша
+    return f"{settings.EMBEDDING_MODEL}:{settings.EMBEDDING_BACKEND}"
+
+
+def search_threshold() -> float:
+    return settings.SEARCH_THRESHOLDS.get(model_tag(), settings.SEARCH_THRESHOLD)
+
+
+def _within(stmt, max_distance: float | None):
+    """Порог расстояния в SQL, но поверх уже готового top-k.
+
+    WHERE distance < x прямо в запросе с ORDER BY по индексу заставил бы
+    iterative scan обойти весь индекс в поисках строк ближе порога, поэтому
+    top-k считаем в MATERIALIZED CTE, а фильтруем уже его (как в README pgvector).
+    """
+    if max_distance is None:
+        return stmt
+    nearest = stmt.cte("nearest").prefix_with("MATERIALIZED")
+    return select(nearest).where(nearest.c.distance < max_distance).order_by(nearest.c.distance)
+
+
+async def tune_vector_search(db: AsyncSession, limit: int, quality: str | None = None, filtered: bool = False):
+    """Выставляет параметры ANN-индекса на текущую транзакцию (SET LOCAL).
+
+    Вызывать перед запросом с ORDER BY по расстоянию, в той же сессии.
+    """
+    ef_search, probes = QUALITY_PRESETS[quality or settings.SEARCH_QUALITY]
+    iterative_scan = settings.VECTOR_ITERATIVE_SCAN
+
+    if iterative_scan == "off":
+        # индекс отдает ef_search кандидатов, и только потом их режет фильтр по городу.
+        # без iterative scan берем кандидатов с запасом, чтобы хватило на limit
+        ef_search = max(ef_search, limit * (settings.VECTOR_OVERFETCH if filtered else 1))
+        if filtered:
+            probes = min(probes * settings.VECTOR_OVERFETCH, settings.IVFFLAT_LISTS)
+    ef_search = min(ef_search, MAX_EF_SEARCH)
+
+    # ivfflat умеет только relaxed_order
+    ivfflat_iterative_scan = "off" if iterative_scan == "off" else "relaxed_order"
+
+    # set_config(..., true) == SET LOCAL, но одним запросом и с параметрами
+    await db.execute(
+        text(
+            "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+            "set_config('ivfflat.probes', :probes, true), "
+            "set_config('hnsw.iterative_scan', :hnsw_iterative, true), "
+            "set_config('ivfflat.iterative_scan', :ivfflat_iterative, true)"
+        ),
+        {
+            "ef_search": str(ef_search),
+            "probes": str(probes),
+            "hnsw_iterative": iterative_scan,
+            "ivfflat_iterative": ivfflat_iterative_scan,
+        },
+    )
+
+async def nearest_places(
+    db: AsyncSession,
+    query_vector: list[float],
+    limit: int,
+    city: str | None = None,
+    quality: str | None = None,
+    precision: str | None = None,
+    exclude=None,
+    max_distance: float | None = None,
+):
+    """Ближайшие места по косинусу: [(строка PLACE_RESPONSE_COLUMNS, расстояние)].
+
+    exclude - SELECT id мест, которые пропускаем (например, избранное в рекомендациях):
+    NOT IN по подзапросу становится хэш-фильтром поверх обхода индекса.
+    max_distance - порог (search_threshold()): строки дальше него БД не отдает.
+    """
+    precision = precision or settings.VECTOR_PRECISION
+    if precision == "binary":
+        return await _nearest_binary(db, query_vector, limit, city, quality, exclude, max_distance)
+
+    # cosine_distance (<=>) - под него построены HNSW-индексы (*_cosine_ops)
+    column = Place.embedding_half if precision == "halfvec" else Place.embedding
+    distance_col = column.cosine_distance(query_vector).label("distance")
+
+    stmt = select(*PLACE_RESPONSE_COLUMNS, distance_col).where(PLACE_IS_LIVE)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    if exclude is not None:
+        stmt = stmt.where(Place.id.not_in(exclude))
+    stmt = _within(stmt.order_by(distance_col).limit(limit), max_distance)
+
+    await tune_vector_search(db, limit, quality, filtered=bool(city) or exclude is not None)
+    result = await db.execute(stmt)
+    return [(row, row.distance) for row in result.all()]
+
+
+async def _nearest_binary(
+    db: AsyncSession,
+    query_vector: list[float],
+    limit: int,
+    city: str | None,
+    quality: str | None,
+    exclude=None,
+    max_distance: float | None = None,
+):
+    # шорт-лист по Хэммингу из индекса по embedding_bits: 1 бит на измерение
+    # грубо путает соседей, поэтому берем с запасом и пересчитываем точно
+    shortlist_size = limit * settings.BINARY_RERANK_FACTOR
+    # CAST обязателен: binary_quantize перегружена для vector и halfvec
+    query_bits = func.binary_quantize(cast(query_vector, Vector(768)))
+
+    shortlist = select(Place.id).where(PLACE_IS_LIVE)
+    if city:
+        shortlist = shortlist.where(Place.city == city)
+    if exclude is not None:
+        shortlist = shortlist.where(Place.id.not_in(exclude))
+    shortlist = shortlist.order_by(Place.embedding_bits.hamming_distance(query_bits)).limit(shortlist_size)
+
+    # точное расстояние считаем только для шорт-листа (heap-чтение shortlist_size строк)
+    distance_col = Place.embedding.cosine_distance(query_vector).label("distance")
+    stmt = (
+        select(*PLACE_RESPONSE_COLUMNS, distance_col)
+        .where(Place.id.in_(shortlist.scalar_subquery()))
+        .order_by(distance_col)
+        .limit(limit)
+    )
+    stmt = _within(stmt, max_distance)
+
+    await tune_vector_search(db, shortlist_size, quality, filtered=bool(city) or exclude is not None)
+    result = await db.execute(stmt)
+    return [(row, row.distance) for row in result.all()]
@@ -0,0 +1,234 @@
+"""Нагрузочный прогон горячих ручек API: пропускная способность и p50/p95/p99.
+
+Полностью офлайн: поднимаем Postgres+pgvector и бэкенд с fake-моделью,
+наливаем синтетику и гоняем сценарии против живого сервера.
+
+    docker compose -f benchmarks/docker-compose.yml up -d --build
+    docker compose -f benchmarks/docker-compose.yml exec backend python -m benchmarks.synthetic --count 100000 --cities 30
+    python -m benchmarks.load --concurrency 32 --requests 2000 --out results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.load --baseline results/old.json --out results/new.json
+
+Для замера настоящей модели достаточно убрать EMBEDDING_BACKEND=fake из compose.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import httpx
+except ImportError as e:
+    raise SystemExit("Для бенчмарка нужен httpx: uv sync --group bench") from e
+
+# запросы в духе реального трафика /search/ai (как в export_onnx.py)
+QUERIES = [
+    "кофе",
+    "музей",
+    "парк с детьми",
+    "где поесть вечером",
+    "выпить коктейль",
+    "посмотреть на закат у моря",
+    "куда сходить в дождь",
+    "история и архитектура",
+]
+# города и типы из TEST_PLACES (seed.py); seed не импортируем, чтобы драйверу
+# не нужны были DATABASE_URL и модель
+CITIES = ["Moscow", "Omsk", "Saint Petersburg"]
+TYPES = ["Бар", "Кафе", "Музей", "Парк"]
+
+BENCH_EMAIL = "bench@tourguide.local"
+BENCH_PASSWORD = "bench-password"
+
+
+class Context:
+    """Общее состояние сценариев: токен бенч-пользователя и id существующих мест"""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        self.token: str | None = None
+        self.place_ids: list[int] = []
+
+    @property
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    async def setup(self):
+        response = await self.client.post("/api/auth/register", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+        if response.status_code != 200:
+            # пользователь остался с прошлого прогона
+            response = await self._login()
+        response.raise_for_status()
+        self.token = response.json()["access_token"]
+
+        # существующие места для избранного: выборки по каждому городу хватает
+        for city in CITIES:
+            response = await self.client.post("/places/search/filters", json={"city": city, "limit": 200})
+            response.raise_for_status()
+            self.place_ids += [place["id"] for place in response.json()]
+        if not self.place_ids:
+            raise SystemExit("В базе нет мест: сначала python -m benchmarks.synthetic")
+
+    async def _login(self) -> httpx.Response:
+        return await self.client.post(
+            "/api/auth/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        )
+
+
+# --- сценарии: один вызов = один HTTP-запрос ---
+
+async def search_ai(ctx: Context) -> httpx.Response:
+    body = {"query": ctx.rng.choice(QUERIES), "city": ctx.rng.choice(CITIES), "limit": 10}
+    return await ctx.client.post("/places/search/ai", json=body)
+
+
+async def search_filters(ctx: Context) -> httpx.Response:
+    body = {"city": ctx.rng.choice(CITIES), "type": ctx.rng.choice(TYPES), "limit": 20}
+    return await ctx.client.post("/places/search/filters", json=body)
+
+
+async def login(ctx: Context) -> httpx.Response:
+    return await ctx._login()
+
+
+async def favorites(ctx: Context) -> httpx.Response:
+    # смесь как у живого клиента: чаще читают, реже добавляют/убирают
+    action = ctx.rng.random()
+    place_id = ctx.rng.choice(ctx.place_ids)
+    if action < 0.6:
+        return await ctx.client.get("/api/users/me/favorites", params={"limit": 20}, headers=ctx.auth)
+    if action < 0.8:
+        return await ctx.client.post(f"/api/users/favorites/{place_id}", headers=ctx.auth)
+    return await ctx.client.delete(f"/api/users/favorites/{place_id}", headers=ctx.auth)
+
+
+SCENARIOS = {
+    "search_ai": search_ai,
+    "search_filters": search_filters,
+    "login": login,
+    "favorites": favorites,
+}
+
+
+async def run_scenario(ctx: Context, scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        await scenario(ctx)
+
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await scenario(ctx)
+                status = str(response.status_code) if response.status_code >= 400 else None
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if status:
+                errors[status] = errors.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, baseline: dict | None):
+    print(f"{'scenario':15} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for name, result in report["scenarios"].items():
+        line = (
+            f"{name:15} {result['throughput_rps']:>8} {result['p50_ms']:>8} "
+            f"{result['p95_ms']:>8} {result['p99_ms']:>8} {sum(result['errors'].values()):>7}"
+        )
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            # относительно прошлого прогона: + по rps и - по p95 - хорошо
+            rps = (result["throughput_rps"] / old["throughput_rps"] - 1) * 100 if old["throughput_rps"] else 0.0
+            p95 = (result["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+            line += f"   rps {rps:+.0f}%, p95 {p95:+.0f}% vs {baseline.get('commit')}"
+        print(line)
+
+
+async def main(args):
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        ctx = Context(client, random.Random(args.seed))
+        await ctx.setup()
+
+        names = list(SCENARIOS) if args.scenario == "all" else args.scenario.split(",")
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "config": {
+                "base_url": args.base_url,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "seed": args.seed,
+            },
+            "scenarios": {},
+        }
+        for name in names:
+            print(f"▶ {name}...")
+            report["scenarios"][name] = await run_scenario(
+                ctx, SCENARIOS[name], args.requests, args.concurrency, args.warmup
+            )
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    print_report(report, baseline)
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"Результаты: {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк горячих ручек API")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--scenario", default="all", help=f"all или через запятую: {','.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="куда сохранить JSON с результатами")
+    parser.add_argument("--baseline", default=None, help="JSON прошлого прогона для сравнения")
+    asyncio.run(main(parser.parse_args()))
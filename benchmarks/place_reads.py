@@ -0,0 +1,99 @@
+"""Сравнение чтения мест: полный ORM Place (с embedding) против легких строк.
+
+    python -m benchmarks.place_reads --city Moscow --limit 50 --repeat 200
+
+Печатает байты на запрос (по pg_column_size) и время выборки/сериализации.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import undefer
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_RESPONSE_COLUMNS
+from app.models.user import User  # noqa: F401 - нужен для маппинга связей
+from app.schemas.place import PlaceResponse
+
+serializer = TypeAdapter(list[PlaceResponse])
+
+
+def full_query(city: str | None, limit: int):
+    # как было до: весь Place, включая 768-мерный вектор
+    stmt = select(Place).options(undefer(Place.embedding))
+    if city:
+        stmt = stmt.where(Place.city == city)
+    return stmt.order_by(Place.id).limit(limit)
+
+
+def lean_query(city: str | None, limit: int):
+    stmt = select(*PLACE_RESPONSE_COLUMNS)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    return stmt.order_by(Place.id).limit(limit)
+
+
+async def payload_bytes(db, columns, city: str | None, limit: int) -> int:
+    # размер данных строк на стороне Postgres - примерно столько уходит по сети
+    ids = select(Place.id)
+    if city:
+        ids = ids.where(Place.city == city)
+    ids = ids.order_by(Place.id).limit(limit)
+    size = sum(func.coalesce(func.pg_column_size(column), 0) for column in columns)
+    result = await db.execute(select(func.sum(size)).where(Place.id.in_(ids)))
+    return int(result.scalar() or 0)
+
+
+async def measure(db, make_query, scalars: bool, repeat: int) -> tuple[float, float]:
+    fetch, serialize = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await db.execute(make_query())
+        rows = result.scalars().all() if scalars else result.all()
+        fetched = time.perf_counter()
+        serializer.dump_json(serializer.validate_python(rows))
+        done = time.perf_counter()
+
+        fetch.append(fetched - started)
+        serialize.append(done - fetched)
+        db.expunge_all()
+    return statistics.mean(fetch) * 1000, statistics.mean(serialize) * 1000
+
+
+async def main(city: str | None, limit: int, repeat: int):
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as db:
+        full_columns = [column for column in Place.__table__.columns if column.name != "search_tsv"]
+        lean_columns = PLACE_RESPONSE_COLUMNS
+
+        report = {}
+        for name, columns, make_query, scalars in (
+            ("full ORM", full_columns, lambda: full_query(city, limit), True),
+            ("lean rows", lean_columns, lambda: lean_query(city, limit), False),
+        ):
+            size = await payload_bytes(db, columns, city, limit)
+            await measure(db, make_query, scalars, 5)  # прогрев
+            fetch_ms, serialize_ms = await measure(db, make_query, scalars, repeat)
+            report[name] = (size, fetch_ms, serialize_ms)
+
+    await engine.dispose()
+
+    print(f"city={city or '*'} limit={limit} repeat={repeat}")
+    print(f"{'':10} {'bytes/req':>10} {'fetch ms':>10} {'serialize ms':>13}")
+    for name, (size, fetch_ms, serialize_ms) in report.items():
+        print(f"{name:10} {size:>10} {fetch_ms:>10.2f} {serialize_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--city", default=None)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.city, args.limit, args.repeat))
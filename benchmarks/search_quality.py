@@ -0,0 +1,231 @@
+"""Качество против скорости векторного поиска: recall@k, MRR и перцентили задержки.
+
+    python -m benchmarks.search_quality labels.jsonl --k 10
+    python -m benchmarks.search_quality labels.jsonl --backends exact,pgvector --precision full,binary --quality fast,accurate
+    python -m benchmarks.search_quality labels.jsonl --out results/quality-onnx.json
+
+labels.jsonl - по строке на запрос, relevant - id или external_id мест:
+
+    {"query": "кофе с видом на реку", "city": "Moscow", "relevant": ["osm:123", 42]}
+
+Эталон exact - полный перебор без индексов; pgvector - те же запросы, что
+у /search/ai (nearest_places), по сетке precision x quality; numpy - in-process
+индекс. Порог SEARCH_THRESHOLD подбирается по F1 на выдаче exact, отдельно
+для текущей модели (EMBEDDING_MODEL:EMBEDDING_BACKEND). Места в базе должны
+быть посчитаны той же моделью, что и запросы.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_IS_LIVE
+from app.models.user import User  # noqa: F401 - нужен для маппинга связей
+from app.services.ml_service import get_embedding, load_backend
+from app.services.vector_index import vector_index
+from app.services.vector_search import nearest_places, search_threshold, model_tag
+
+
+async def load_labels(db, path: Path) -> list[dict]:
+    """Строки файла + relevant, приведенные к id мест"""
+    labels = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    external = {key for label in labels for key in label["relevant"] if isinstance(key, str)}
+    ids_by_key = {}
+    if external:
+        result = await db.execute(select(Place.external_id, Place.id).where(Place.external_id.in_(external)))
+        ids_by_key = dict(result.all())
+
+    for label in labels:
+        label["relevant_ids"] = {ids_by_key.get(key) if isinstance(key, str) else key for key in label["relevant"]}
+        label["relevant_ids"].discard(None)
+    return [label for label in labels if label["relevant_ids"]]
+
+
+async def exact_search(db, query_vector: list[float], city: str | None, limit: int) -> list[tuple[int, float]]:
+    # без индексов планировщику остается только полный перебор с сортировкой
+    await db.execute(text("SET LOCAL enable_indexscan = off"))
+    await db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    distance = Place.embedding.cosine_distance(query_vector)
+    stmt = select(Place.id, distance).where(PLACE_IS_LIVE)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    result = await db.execute(stmt.order_by(distance).limit(limit))
+    return [(place_id, float(dist)) for place_id, dist in result.all()]
+
+
+def configs(args) -> list[dict]:
+    backends = args.backends.split(",")
+    grid = []
+    if "exact" in backends:
+        grid.append({"backend": "exact"})
+    if "pgvector" in backends:
+        for precision, quality in itertools.product(args.precision.split(","), args.quality.split(",")):
+            grid.append({"backend": "pgvector", "precision": precision, "quality": quality})
+    if "numpy" in backends:
+        grid.append({"backend": "numpy"})
+    return grid
+
+
+def config_name(config: dict) -> str:
+    return ":".join(config.values())
+
+
+async def run_search(db, config: dict, query_vector: list[float], city: str | None, k: int) -> list[int]:
+    if config["backend"] == "exact":
+        return [place_id for place_id, _ in await exact_search(db, query_vector, city, k)]
+    if config["backend"] == "numpy":
+        return [place_id for place_id, _ in await vector_index.asearch(query_vector, city, k)]
+    rows = await nearest_places(db, query_vector, k, city, config["quality"], config["precision"])
+    return [row.id for row, _ in rows]
+
+
+def ranking_metrics(found: list[int], relevant: set[int]) -> tuple[float, float]:
+    """(recall@k, reciprocal rank первого релевантного)"""
+    recall = len(set(found) & relevant) / len(relevant)
+    rank = next((i for i, place_id in enumerate(found, 1) if place_id in relevant), None)
+    return recall, 1 / rank if rank else 0.0
+
+
+def percentiles_ms(latencies: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+def suggest_threshold(pool: list[tuple[float, bool]], total_relevant: int) -> dict:
+    """Порог по максимуму F1 на выдаче exact: все, что ближе порога, считаем результатом.
+
+    pool - (расстояние, релевантно ли) по всем запросам; релевантные места,
+    не попавшие в пул, считаются потерянными при любом пороге.
+    """
+    if not pool or not total_relevant:
+        return {}
+    distances = np.array([dist for dist, _ in pool])
+    relevant = np.array([is_relevant for _, is_relevant in pool])
+    order = np.argsort(distances)
+    distances, relevant = distances[order], relevant[order]
+
+    # порог сразу после i-го результата: берем i + 1 ближайших
+    true_positive = np.cumsum(relevant)
+    kept = np.arange(1, len(distances) + 1)
+    precision = true_positive / kept
+    recall = true_positive / total_relevant
+    f1 = np.where(precision + recall > 0, 2 * precision * recall / np.maximum(precision + recall, 1e-12), 0.0)
+
+    best = int(np.argmax(f1))
+    # середина между последним взятым и следующим: сравнение в SQL строгое (<)
+    upper = distances[best + 1] if best + 1 < len(distances) else distances[best] + 1e-3
+    threshold = float((distances[best] + upper) / 2)
+
+    current = search_threshold()
+    at_current = int(np.searchsorted(distances, current, side="left"))
+    current_tp = int(true_positive[at_current - 1]) if at_current else 0
+    return {
+        "threshold": round(threshold, 4),
+        "precision": round(float(precision[best]), 3),
+        "recall": round(float(recall[best]), 3),
+        "f1": round(float(f1[best]), 3),
+        "current_threshold": current,
+        "current_precision": round(current_tp / at_current, 3) if at_current else 0.0,
+        "current_recall": round(current_tp / total_relevant, 3),
+    }
+
+
+async def main(args):
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    grid = configs(args)
+
+    async with SessionLocal() as db:
+        labels = await load_labels(db, Path(args.labels))
+        if not labels:
+            raise SystemExit("Ни у одного запроса не нашлось релевантных мест в базе")
+        if any(config["backend"] == "numpy" for config in grid):
+            await vector_index.load(db)
+        await db.rollback()
+
+        # модель грузим до замеров: холодный старт не должен попасть в перцентили
+        await asyncio.to_thread(load_backend)
+        embed_latencies = []
+        for label in labels:
+            started = time.perf_counter()
+            label["vector"] = await get_embedding(label["query"])
+            embed_latencies.append(time.perf_counter() - started)
+
+        results = {}
+        for config in grid:
+            name = config_name(config)
+            print(f"▶ {name}...")
+            latencies, recalls, reciprocal_ranks = [], [], []
+            for label in labels:
+                started = time.perf_counter()
+                found = await run_search(db, config, label["vector"], label.get("city"), args.k)
+                latencies.append(time.perf_counter() - started)
+                await db.rollback()  # SET LOCAL живет до конца транзакции
+                recall, reciprocal_rank = ranking_metrics(found, label["relevant_ids"])
+                recalls.append(recall)
+                reciprocal_ranks.append(reciprocal_rank)
+            results[name] = {
+                **config,
+                f"recall@{args.k}": round(float(np.mean(recalls)), 4),
+                "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+                **percentiles_ms(latencies),
+            }
+
+        pool = []
+        for label in labels:
+            for place_id, dist in await exact_search(db, label["vector"], label.get("city"), args.pool):
+                pool.append((dist, place_id in label["relevant_ids"]))
+            await db.rollback()
+        threshold = suggest_threshold(pool, sum(len(label["relevant_ids"]) for label in labels))
+
+    await engine.dispose()
+
+    print(f"\nмодель {model_tag()}, запросов {len(labels)}, embed {percentiles_ms(embed_latencies)}\n")
+    print(f"{'config':28} {f'recall@{args.k}':>10} {'mrr':>7} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, result in results.items():
+        print(
+            f"{name:28} {result[f'recall@{args.k}']:>10} {result['mrr']:>7} "
+            f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}"
+        )
+    if threshold:
+        print(
+            f"\nпорог: {threshold['threshold']} (precision {threshold['precision']}, recall {threshold['recall']}, "
+            f"F1 {threshold['f1']}); сейчас {threshold['current_threshold']} "
+            f"(precision {threshold['current_precision']}, recall {threshold['current_recall']})"
+        )
+        print(f"SEARCH_THRESHOLDS='{json.dumps({model_tag(): threshold['threshold']})}'")
+
+    if args.out:
+        report = {
+            "model": model_tag(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "queries": len(labels),
+            "k": args.k,
+            "embed": percentiles_ms(embed_latencies),
+            "configs": results,
+            "threshold": threshold,
+        }
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"Результаты: {args.out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="recall@k / MRR / задержка поиска и подбор SEARCH_THRESHOLD")
+    parser.add_argument("labels", help="JSONL: query, city, relevant")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", default="exact,pgvector", help="через запятую: exact,pgvector,numpy")
+    parser.add_argument("--precision", default="full", help="для pgvector: full,halfvec,binary")
+    parser.add_argument("--quality", default="fast,balanced,accurate", help="для pgvector")
+    parser.add_argument("--pool", type=int, default=50, help="результатов exact на запрос для подбора порога")
+    parser.add_argument("--out", default=None, help="куда сохранить JSON с результатами")
+    asyncio.run(main(parser.parse_args()))
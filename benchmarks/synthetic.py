@@ -0,0 +1,124 @@
+"""Синтетические места в формате TEST_PLACES из seed.py, от 10k до 1M строк.
+
+    EMBEDDING_BACKEND=fake python -m benchmarks.synthetic --count 100000
+    python -m benchmarks.synthetic --count 1000000 --out places.jsonl   # файл для ingest.py
+
+Генерация детерминирована (--seed), так что прогоны на разных коммитах
+сравнивают одни и те же данные.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.place import Place  # noqa: F401 - регистрируем маппинг
+from app.models.user import User  # noqa: F401
+from app.services.ingest import ingest, aiter_sync, IngestStats
+from app.services.neighbors import rebuild_neighbors
+from app.services.search_cache import search_cache
+from seed import TEST_PLACES
+
+# координаты синтетических мест раскидываем вокруг центра города (~10 км)
+CITY_CENTERS = {
+    "Moscow": (55.7558, 37.6173),
+    "Saint Petersburg": (59.9343, 30.3351),
+    "Omsk": (54.9885, 73.3242),
+}
+SPREAD_DEG = 0.1
+
+
+def generate_places(count: int, cities: int = 0, seed: int = 0) -> Iterator[dict]:
+    """Клонирует TEST_PLACES с перемешанным контекстом и сдвинутыми координатами.
+
+    cities > 0 добавляет города "Moscow 2", "Omsk 3"... чтобы фильтр по городу
+    был селективным, как в реальной базе со многими городами.
+    """
+    rng = random.Random(seed)
+    base_cities = sorted({place["city"] for place in TEST_PLACES})
+    # (название, реальный город, вокруг которого раскидываем координаты)
+    city_names = [(city, city) for city in base_cities] + [
+        (f"{base_cities[i % len(base_cities)]} {i // len(base_cities) + 2}", base_cities[i % len(base_cities)])
+        for i in range(cities)
+    ]
+    # общий словарь: к контексту места подмешиваем чужие слова, чтобы векторы различались
+    vocabulary = sorted({word for place in TEST_PLACES for word in place["context"].replace(",", " ").split()})
+
+    for i in range(count):
+        base = TEST_PLACES[i % len(TEST_PLACES)]
+        city, real_city = city_names[rng.randrange(len(city_names))]
+        center_lat, center_lon = CITY_CENTERS[real_city]
+
+        words = base["context"].replace(",", " ").split()
+        rng.shuffle(words)
+        words = words[: max(5, len(words) * 2 // 3)] + rng.sample(vocabulary, 5)
+
+        yield {
+            "external_id": f"synthetic:{seed}:{i}",
+            "name": f"{base['name']} #{i}",
+            "city": city,
+            "type": base["type"],
+            "price": base["price"],
+            "lat": round(center_lat + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+            "lon": round(center_lon + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+            "image_url": base.get("image_url"),
+            "description": base["description"],
+            "search_context": f"{base['description']} {' '.join(words)}",
+        }
+
+
+def print_progress(stats: IngestStats):
+    print(f"  чанк {stats.chunks}: всего {stats.total} ({stats.rate:.0f} строк/с)")
+
+
+async def load(count: int, cities: int, seed: int, chunk_size: int, truncate: bool):
+    if settings.EMBEDDING_BACKEND != "fake":
+        print(f"⚠️  EMBEDDING_BACKEND={settings.EMBEDDING_BACKEND}: векторы посчитает настоящая модель")
+
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as db:
+        if truncate:
+            # избранное уходит каскадом, вкус (user_tastes) на него опирается - чистим вместе
+            await db.execute(text("TRUNCATE TABLE places, user_tastes RESTART IDENTITY CASCADE"))
+            await db.commit()
+        # похожие места считаем один раз в конце блоками, а не на каждый чанк
+        stats = await ingest(
+            db, aiter_sync(generate_places(count, cities, seed)), chunk_size, print_progress, neighbors=False
+        )
+        print("  place_neighbors...")
+        await rebuild_neighbors(db)
+
+    if search_cache is not None:
+        if truncate:
+            await search_cache.reset()
+        else:
+            await search_cache.invalidate(stats.cities, stats.updated_ids)
+
+    await engine.dispose()
+    print(f"✅ Готово: {stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Синтетические места для бенчмарков")
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--cities", type=int, default=0, help="дополнительные синтетические города")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--out", default=None, help="записать JSONL ('-' - stdout) вместо загрузки в БД")
+    parser.add_argument("--keep", action="store_true", help="не очищать places перед загрузкой")
+    args = parser.parse_args()
+
+    if args.out:
+        out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        with out:
+            for place in generate_places(args.count, args.cities, args.seed):
+                out.write(json.dumps(place, ensure_ascii=False) + "\n")
+    else:
+        asyncio.run(load(args.count, args.cities, args.seed, args.chunk_size, truncate=not args.keep))
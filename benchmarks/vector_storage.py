@@ -0,0 +1,166 @@
+"""Сжатое хранение эмбеддингов: размер, время построения индексов и recall.
+
+    python -m benchmarks.vector_storage --queries 200 --limit 10
+    python -m benchmarks.vector_storage --rebuild        # + REINDEX каждого индекса (блокирует places!)
+
+Эталон - точный поиск (seq scan с сортировкой, индексы выключены), с ним
+сравниваются режимы VECTOR_PRECISION: full, halfvec и binary + rerank.
+Запросы - эмбеддинги случайных мест с шумом, так что модель не нужна.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.place import Place, PLACE_IS_LIVE
+from app.models.user import User  # noqa: F401 - нужен для маппинга связей
+from app.services.vector_search import nearest_places
+
+PRECISIONS = ("full", "halfvec", "binary")
+INDEXES = {
+    "full": f"ix_places_embedding_{settings.VECTOR_INDEX}",
+    "halfvec": "ix_places_embedding_half_hnsw",
+    "binary": "ix_places_embedding_bits_hnsw",
+}
+COLUMNS = {"full": "embedding", "halfvec": "embedding_half", "binary": "embedding_bits"}
+
+
+def mb(size: int | None) -> str:
+    return "-" if size is None else f"{size / 2**20:.1f} MB"
+
+
+async def storage_report(db) -> dict:
+    """Байты на вектор по колонкам и размер их индексов"""
+    row = (await db.execute(text(
+        "SELECT count(*) AS rows, "
+        "avg(pg_column_size(embedding)) AS full, "
+        "avg(pg_column_size(embedding_half)) AS halfvec, "
+        "avg(pg_column_size(embedding_bits)) AS binary "
+        "FROM places"
+    ))).one()
+    report = {"rows": row.rows, "table": (await db.execute(text("SELECT pg_table_size('places')"))).scalar()}
+    for precision, index in INDEXES.items():
+        # to_regclass -> NULL, если индекса нет (например, ivfflat вместо hnsw)
+        index_size = (await db.execute(
+            text("SELECT pg_relation_size(to_regclass(:name))"), {"name": index}
+        )).scalar()
+        report[precision] = {
+            "bytes_per_vector": round(float(getattr(row, precision) or 0)),
+            "index": index_size,
+        }
+    return report
+
+
+async def rebuild_seconds(db, index: str) -> float | None:
+    exists = (await db.execute(text("SELECT to_regclass(:name)"), {"name": index})).scalar()
+    if exists is None:
+        return None
+    started = time.perf_counter()
+    # обычный REINDEX: CONCURRENTLY мерил бы еще и ожидание чужих транзакций
+    await db.execute(text(f"REINDEX INDEX {index}"))
+    await db.commit()
+    return time.perf_counter() - started
+
+
+async def sample_queries(db, count: int, noise: float, seed: int) -> list[tuple[list[float], str]]:
+    """Векторы случайных мест + шум: запрос рядом с реальными данными, но не совпадает с ними"""
+    result = await db.execute(
+        select(Place.embedding, Place.city)
+        .where(PLACE_IS_LIVE, Place.embedding.is_not(None))
+        .order_by(func.random())
+        .limit(count)
+    )
+    rng = np.random.default_rng(seed)
+    queries = []
+    for embedding, city in result.all():
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector + rng.normal(0, noise, vector.shape).astype(np.float32)
+        queries.append(((vector / np.linalg.norm(vector)).tolist(), city))
+    return queries
+
+
+async def exact_ids(db, query_vector: list[float], city: str | None, limit: int) -> list[int]:
+    # без индексов планировщику остается только полный перебор с сортировкой
+    await db.execute(text("SET LOCAL enable_indexscan = off"))
+    await db.execute(text("SET LOCAL enable_bitmapscan = off"))
+    distance = Place.embedding.cosine_distance(query_vector)
+    stmt = select(Place.id).where(PLACE_IS_LIVE)
+    if city:
+        stmt = stmt.where(Place.city == city)
+    result = await db.execute(stmt.order_by(distance).limit(limit))
+    ids = list(result.scalars())
+    await db.rollback()
+    return ids
+
+
+async def main(args):
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as db:
+        storage = await storage_report(db)
+        await db.rollback()
+
+        build = {}
+        if args.rebuild:
+            for precision, index in INDEXES.items():
+                print(f"▶ REINDEX {index}...")
+                build[precision] = await rebuild_seconds(db, index)
+
+        queries = await sample_queries(db, args.queries, args.noise, args.seed)
+        await db.rollback()
+        if not queries:
+            raise SystemExit("В базе нет мест: сначала python -m benchmarks.synthetic")
+
+        truth = []
+        for query_vector, city in queries:
+            truth.append(set(await exact_ids(db, query_vector, city if args.by_city else None, args.limit)))
+
+        results = {}
+        for precision in PRECISIONS:
+            recalls, latencies = [], []
+            for (query_vector, city), expected in zip(queries, truth):
+                started = time.perf_counter()
+                rows = await nearest_places(
+                    db, query_vector, args.limit, city if args.by_city else None, args.quality, precision
+                )
+                latencies.append(time.perf_counter() - started)
+                await db.rollback()  # SET LOCAL из tune_vector_search живет до конца транзакции
+                if expected:
+                    recalls.append(len({row.id for row, _ in rows} & expected) / len(expected))
+            results[precision] = {
+                "recall": statistics.mean(recalls) if recalls else 0.0,
+                "p50_ms": statistics.median(latencies) * 1000,
+            }
+
+    await engine.dispose()
+
+    print(f"\nмест: {storage['rows']}, таблица (без индексов): {mb(storage['table'])}")
+    print(f"запросов: {len(queries)}, limit {args.limit}, quality {args.quality or settings.SEARCH_QUALITY}, "
+          f"rerank x{settings.BINARY_RERANK_FACTOR}, {'по городу' if args.by_city else 'без города'}\n")
+    print(f"{'precision':10} {'байт/вектор':>12} {'индекс':>12} {'REINDEX, с':>11} {'recall@k':>9} {'p50, мс':>8}")
+    for precision in PRECISIONS:
+        seconds = build.get(precision)
+        print(
+            f"{precision:10} {storage[precision]['bytes_per_vector']:>12} {mb(storage[precision]['index']):>12} "
+            f"{'-' if seconds is None else f'{seconds:.1f}':>11} "
+            f"{results[precision]['recall']:>9.3f} {results[precision]['p50_ms']:>8.2f}"
+        )
+    print(f"\nbinary: шорт-лист по {COLUMNS['binary']}, точный пересчет по {COLUMNS['full']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Размер и recall сжатых эмбеддингов (halfvec, binary)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--quality", choices=["fast", "balanced", "accurate"], default=None)
+    parser.add_argument("--noise", type=float, default=0.02, help="шум к вектору места (до нормировки)")
+    parser.add_argument("--by-city", action="store_true", help="искать в городе исходного места, как /search/ai")
+    parser.add_argument("--rebuild", action="store_true", help="замерить REINDEX каждого индекса")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
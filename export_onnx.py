@@ -0,0 +1,115 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# веса берем только из локального кэша HF, в хаб не ходим
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_backends import (
+    MAX_SEQ_LENGTH,
+    ONNX_FP32_FILE,
+    ONNX_INT8_FILE,
+    OnnxBackend,
+    TorchBackend,
+)
+from seed import TEST_PLACES
+
+# Запросы в духе реального трафика /search/ai для проверки ранжирования
+CHECK_QUERIES = [
+    "кофе",
+    "музей",
+    "парк с детьми",
+    "где поесть вечером",
+    "выпить коктейль",
+    "посмотреть на закат у моря",
+    "куда сходить в дождь",
+    "история и архитектура",
+]
+
+
+def export(model_name: str, out_dir: Path):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # sentence-transformers хранит модель под этим именем в кэше HF
+    hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+    tokenizer = AutoTokenizer.from_pretrained(hf_name, local_files_only=True)
+    model = AutoModel.from_pretrained(hf_name, local_files_only=True).eval()
+    tokenizer.save_pretrained(out_dir)
+
+    sample = tokenizer(["пример"], return_tensors="pt", padding="max_length", max_length=MAX_SEQ_LENGTH)
+    fp32_path = out_dir / ONNX_FP32_FILE
+    print(f"Экспорт {hf_name} -> {fp32_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            str(fp32_path),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "seq"},
+                "attention_mask": {0: "batch", 1: "seq"},
+                "last_hidden_state": {0: "batch", 1: "seq"},
+            },
+            opset_version=17,
+        )
+
+    int8_path = out_dir / ONNX_INT8_FILE
+    print(f"Динамическая int8-квантизация -> {int8_path}")
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+    for path in (fp32_path, int8_path):
+        print(f"  {path.name}: {path.stat().st_size / 2**20:.0f} MB")
+
+
+def check(model_name: str, out_dir: Path, min_cosine: float) -> bool:
+    """Сравнивает onnx-int8 с эталонным torch: косинус векторов и top-k поиска"""
+    reference = TorchBackend(model_name)
+    candidate = OnnxBackend(str(out_dir), quantized=True)
+
+    places = [f"{p['description']} {p.get('context', '')}" for p in TEST_PLACES]
+    texts = places + CHECK_QUERIES
+
+    ref = np.asarray(reference.encode(texts), dtype=np.float32)
+    cand = np.asarray(candidate.encode(texts), dtype=np.float32)
+    cosines = (ref * cand).sum(axis=1)
+    print(f"Косинус torch vs onnx-int8: min={cosines.min():.4f} mean={cosines.mean():.4f}")
+
+    # ранжирование: места считаем эталоном (так они лежат в БД), запросы - каждым бэкендом
+    ref_places, ref_queries, cand_queries = ref[: len(places)], ref[len(places):], cand[len(places):]
+    k = 3
+    top1_same = 0
+    overlap = 0.0
+    for query, ref_q, cand_q in zip(CHECK_QUERIES, ref_queries, cand_queries):
+        ref_top = np.argsort(-(ref_places @ ref_q))[:k]
+        cand_top = np.argsort(-(ref_places @ cand_q))[:k]
+        top1_same += ref_top[0] == cand_top[0]
+        overlap += len(set(ref_top) & set(cand_top)) / k
+        if ref_top[0] != cand_top[0]:
+            print(f"  '{query}': top-1 разошелся ({TEST_PLACES[ref_top[0]]['name']} vs {TEST_PLACES[cand_top[0]]['name']})")
+
+    print(f"Top-1 совпадает: {top1_same}/{len(CHECK_QUERIES)}, overlap@{k}: {overlap / len(CHECK_QUERIES):.2f}")
+
+    ok = cosines.min() >= min_cosine and top1_same == len(CHECK_QUERIES)
+    print("✅ onnx-int8 можно включать" if ok else "❌ onnx-int8 заметно расходится с эталоном")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Экспорт модели в ONNX + int8 и проверка согласия с torch")
+    parser.add_argument("--out", type=Path, default=Path(settings.ONNX_MODEL_DIR))
+    parser.add_argument("--check-only", action="store_true", help="не экспортировать, только сравнить")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if not args.check_only:
+        export(settings.EMBEDDING_MODEL, args.out)
+    sys.exit(0 if check(settings.EMBEDDING_MODEL, args.out, args.min_cosine) else 1)
@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.services.ingest import ingest, iter_records, aiter_sync, IngestStats, MAX_CHUNK_SIZE
+from app.services.search_cache import search_cache
+
+
+def print_progress(stats: IngestStats):
+    print(
+        f"  чанк {stats.chunks}: всего {stats.total}, "
+        f"векторизовано {stats.embedded}, без изменений {stats.skipped}, битых {stats.invalid} "
+        f"({stats.rate:.0f} строк/с)"
+    )
+
+
+async def main(path: Path, fmt: str, chunk_size: int):
+    print(f"🚀 Импорт {path} ({fmt}, чанки по {chunk_size})...")
+
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    stats = IngestStats()
+    try:
+        async with SessionLocal() as db:
+            with path.open(encoding="utf-8") as f:
+                await ingest(db, iter_records(aiter_sync(f), fmt), chunk_size, print_progress, stats=stats)
+    finally:
+        # при общем кэше (redis) воркеры API сразу перестанут отдавать старые результаты -
+        # в том числе по чанкам, закоммиченным до ошибки
+        if search_cache is not None:
+            await search_cache.invalidate(stats.cities, stats.updated_ids)
+
+    await engine.dispose()
+    print(f"✅ Готово: {stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Потоковый импорт мест из JSONL/CSV")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="по умолчанию - по расширению")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    if not 1 <= args.chunk_size <= MAX_CHUNK_SIZE:
+        parser.error(f"--chunk-size: от 1 до {MAX_CHUNK_SIZE}")
+
+    fmt = args.format or ("csv" if args.path.suffix == ".csv" else "jsonl")
+    asyncio.run(main(args.path, fmt, args.chunk_size))
@@ -0,0 +1,33 @@
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from app.core.config import settings
+from app.models.user import User  # noqa: F401 - нужен для маппинга связей
+from app.services.neighbors import rebuild_neighbors
+
+
+def print_progress(city: str | None, count: int):
+    print(f"  {city or 'весь каталог'}: {count} мест")
+
+
+async def main(batch_size: int):
+    scope = "внутри города" if settings.SIMILAR_SAME_CITY else "по всему каталогу"
+    print(f"🚀 Пересборка place_neighbors: top-{settings.SIMILAR_NEIGHBORS} {scope}...")
+
+    engine = create_async_engine(settings.DATABASE_URL)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as db:
+        total = await rebuild_neighbors(db, batch_size, print_progress)
+
+    await engine.dispose()
+    print(f"✅ Готово: {total} мест")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Полная пересборка похожих мест (place_neighbors)")
+    parser.add_argument("--batch-size", type=int, default=settings.SIMILAR_BATCH_SIZE, help="мест на одно умножение матриц")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -6,8 +6,8 @@ from sqlalchemy import text
 from app.core.config import settings
 from app.models.place import Place
 from app.models.user import User
-# Импортируем твою асинхронную функцию
-from app.services.ml_service import get_embedding
+from app.services.ingest import ingest, aiter_sync
+from app.services.search_cache import search_cache
 
 PLACE_IMAGES ={}
 TEST_PLACES = [
@@ -103,32 +103,22 @@ async def seed_data():
     SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
     async with SessionLocal() as db:
-        await db.execute(text("TRUNCATE TABLE places RESTART IDENTITY CASCADE"))
-        
-        for data in TEST_PLACES:
-            print(f"Adding: {data['name']}...")
-            
-            # Собираем текст
-            text_for_vector = f"{data['description']} {data.get('context', '')}"
-            
-            # ВАЖНО: Добавили await, так как твоя функция async
-            vector = await get_embedding(text_for_vector)
-            
-            place = Place(
-                name=data["name"],
-                city=data["city"],
-                type=data["type"],
-                price=data["price"],
-                description=data["description"],
-                lat=data.get("lat"), 
-                lon=data.get("lon"), 
-                image_url=data.get("image_url"), 
-                search_context=text_for_vector,
-                embedding=vector
-            )
-            db.add(place)
-        
-        await db.commit()
+        # избранное уходит каскадом, вкус (user_tastes) на него опирается - чистим вместе
+        await db.execute(text("TRUNCATE TABLE places, user_tastes RESTART IDENTITY CASCADE"))
+
+        # Собираем текст и отдаем всё одним батчем в общий пайплайн импорта
+        # (векторы берутся из кэша, если тексты не менялись)
+        records = [
+            {**data, "search_context": f"{data['description']} {data.get('context', '')}"}
+            for data in TEST_PLACES
+        ]
+        stats = await ingest(db, aiter_sync(records))
+        print(f"Added: {stats.total}, векторизовано: {stats.embedded}")
+
+        # id начались заново - общий кэш поиска (redis) должен забыть всё
+        if search_cache is not None:
+            await search_cache.reset()
+
         print("✅ База данных успешно обновлена!")
     
     await engine.dispose()